@@ -5,7 +5,7 @@ a = Analysis(
     ['divelog_app.py'],
     pathex=[],
     binaries=[],
-    datas=[('arrowcrab.png', '.')],
+    datas=[('arrowcrab.png', '.'), ('arrowcrab_64.png', '.'), ('arrowcrab_80.png', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -7,19 +7,69 @@ dashboard renders inside the app — no external browser needed.
 """
 
 import webview
+import atexit
+import ctypes
+import functools
+import gzip
+import http.server
 import json
 import sys
 import os
-import base64
 import io
+import mmap
+import secrets
 import tempfile
 import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# pybase64 (SIMD libbase64) is optional; fall back to the stdlib codec
+try:
+    import pybase64 as _b64
+
+    _b64encode_str = _b64.b64encode_as_string
+except ImportError:
+    import base64 as _b64
+
+    def _b64encode_str(data):
+        return _b64.b64encode(data).decode("ascii")
+
+# Numba is optional; without it the colour-correction kernels run in NumPy
+try:
+    import numba
+    from numba import njit, prange
+
+    # The kernels are launched from Api worker threads, which can leave TBB
+    # hanging at interpreter exit; prefer OpenMP or numba's own work queue
+    numba.config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
+    # The on-disk cache is located from the kernel's .py source, which a
+    # frozen build doesn't ship; cache=True there fails at decoration
+    _JIT_CACHE = not getattr(sys, "frozen", False)
+except ImportError:
+    njit = None
+
+# PyTurboJPEG is optional; it needs libjpeg-turbo's turbojpeg library, so
+# any failure to load it falls back to Pillow's encoder
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB, TJSAMP_420, TJFLAG_PROGRESSIVE
+
+    _tj = TurboJPEG()
+except Exception:
+    _tj = None
 
 from generate_dive_dashboard import (
+    orjson,
+    _json_loads,
+    _json_dumps,
+    _json_dumpb,
+    open_dive_log,
     extract_dive_data,
     get_computer_info,
     calculate_trip_stats,
     generate_html,
+    get_logo_base64,
+    RENDERER_VERSION,
 )
 
 # ── Asset path (dev vs PyInstaller) ──────────────────────────────────────
@@ -31,8 +81,105 @@ else:
     APP_DIR = ASSET_DIR
 
 
+def _load_json_file(path):
+    """Parse a JSON file; with orjson it is parsed straight from an mmap."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        # json.loads takes bytes but not buffers, and mmap can't map 0 bytes
+        if orjson is None or not size:
+            return _json_loads(f.read(size))
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return _json_loads(view)
+
+
+# Read size for streamed base64 encoding. Must be a multiple of 3 so that
+# no padding is emitted between chunks.
+_B64_CHUNK = 48 * 1024
+
+
+def _file_to_b64_datauri(path, mime):
+    """Return the file at *path* as a data-URI, encoding it in chunks.
+
+    The output is sized up front and every chunk is read into the same
+    buffer, so a large sound file costs one allocation, not one per chunk.
+    """
+    prefix = f"data:{mime};base64,".encode("ascii")
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        out = bytearray(len(prefix) + 4 * ((size + 2) // 3))
+        out[:len(prefix)] = prefix
+        pos = len(prefix)
+        buf = bytearray(_B64_CHUNK)
+        view = memoryview(buf)
+        while n := f.readinto(buf):
+            enc = _b64.b64encode(view[:n])
+            out[pos:pos + len(enc)] = enc
+            pos += len(enc)
+    return str(memoryview(out)[:pos], "ascii")
+
+
+def _jpeg_datauri(img, quality, progressive=False):
+    """Encode an RGB PIL image or uint8 array as a JPEG data-URI."""
+    import numpy as np
+
+    if _tj is not None:
+        # Same 4:2:0 subsampling Pillow uses at these qualities
+        data = _tj.encode(
+            np.asarray(img),
+            quality=quality,
+            pixel_format=TJPF_RGB,
+            jpeg_subsample=TJSAMP_420,
+            flags=TJFLAG_PROGRESSIVE if progressive else 0,
+        )
+    else:
+        from PIL import Image
+
+        if isinstance(img, np.ndarray):
+            img = Image.fromarray(img)
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=quality, progressive=progressive)
+        # Encode from the BytesIO buffer itself rather than a bytes copy
+        data = buf.getbuffer()
+    return "data:image/jpeg;base64," + _b64encode_str(data)
+
+
+def _gzip_b64(text):
+    """gzip + base64 *text* for the JS bridge (inflated there with
+    DecompressionStream): dashboard HTML shrinks ~5x and needs no escaping."""
+    return _b64encode_str(gzip.compress(text.encode("utf-8"), mtime=0))
+
+
+def _cache_put(cache, key, value, limit):
+    """Store *value* in the dict *cache*, first dropping its oldest entry
+    (dicts keep insertion order) if it already holds *limit* items."""
+    cache.pop(key, None)
+    if len(cache) >= limit:
+        del cache[next(iter(cache))]
+    cache[key] = value
+
+
+def _decode_data_uri(data):
+    """Decode base64 data, skipping an optional ``data:...;base64,`` prefix.
+
+    The prefix is dropped through a memoryview slice so the (possibly
+    multi-MB) payload is not copied a second time.
+    """
+    buf = data.encode("ascii")
+    start = buf.find(b",") + 1 if buf.startswith(b"data:") else 0
+    return _b64.b64decode(memoryview(buf)[start:])
+
+
+@functools.cache
 def _logo_data_uri():
-    """Return arrowcrab.png as a compact base64 data-URI."""
+    """Return the 64x64 logo as a base64 data-URI (computed once).
+
+    arrowcrab_64.png is shipped pre-sized; the full-size arrowcrab.png is
+    only resized here if it is missing.
+    """
+    small = os.path.join(ASSET_DIR, "arrowcrab_64.png")
+    if os.path.exists(small):
+        return _file_to_b64_datauri(small, "image/png")
     path = os.path.join(ASSET_DIR, "arrowcrab.png")
     if not os.path.exists(path):
         return ""
@@ -41,18 +188,405 @@ def _logo_data_uri():
 
         img = Image.open(path).resize((64, 64), Image.LANCZOS)
         buf = io.BytesIO()
-        img.save(buf, format="PNG", optimize=True)
-        b64 = base64.b64encode(buf.getvalue()).decode("ascii")
+        # optimize=True saves only a few bytes at 64x64 for a slow zlib pass
+        img.save(buf, format="PNG")
+        b64 = _b64encode_str(buf.getbuffer())
     except ImportError:
-        with open(path, "rb") as f:
-            b64 = base64.b64encode(f.read()).decode("ascii")
+        return _file_to_b64_datauri(path, "image/png")
     return "data:image/png;base64," + b64
 
 
+def _drive_roots():
+    """Existing drive roots among C:-F:, from one GetLogicalDrives call.
+
+    Not cached: card readers and USB drives come and go while the app runs.
+    """
+    if sys.platform != "win32":
+        return []
+    mask = ctypes.windll.kernel32.GetLogicalDrives()
+    return [f"{c}:\\" for c in "CDEF" if mask & (1 << (ord(c) - ord("A")))]
+
+
+def _pictures_sidecar(project_path):
+    """Path of the picture manifest saved alongside a project file."""
+    return os.path.splitext(project_path)[0] + ".pics.json"
+
+
+_SOUND_MIME = {
+    ".wav": "audio/wav", ".mp3": "audio/mpeg",
+    ".ogg": "audio/ogg", ".m4a": "audio/mp4",
+    ".aac": "audio/aac",
+}
+_SOUND_EXTS = frozenset(_SOUND_MIME)
+
+# resolve_folder cache: bounded, and misses are retried after a while in
+# case the folder shows up (e.g. a card reader gets plugged in)
+_FOLDER_CACHE_MAX = 256
+_FOLDER_MISS_TTL = 30.0
+# Listings of the searched locations are reused this long across lookups
+_FOLDER_INDEX_TTL = 60.0
+# Drive-root folders that never hold photo folders; skip probing them
+_FOLDER_SKIP = frozenset({
+    "$Recycle.Bin", "System Volume Information", "Windows",
+    "Program Files", "Program Files (x86)", "ProgramData",
+    "node_modules", ".git",
+})
+
+
+def _list_dirs(path):
+    """Map normcased subfolder names of *path* to their paths."""
+    try:
+        with os.scandir(path) as it:
+            return {os.path.normcase(e.name): e.path for e in it if e.is_dir()}
+    except OSError:
+        return {}
+
+# O_SEQUENTIAL lets Windows prefetch/evict large writes as a stream;
+# both Windows-only flags are 0 elsewhere.
+_WRITE_FLAGS = (
+    os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    | getattr(os, "O_BINARY", 0) | getattr(os, "O_SEQUENTIAL", 0)
+)
+
+
+def _write_bytes(path, data, sync=False):
+    """Write a (possibly large) bytes blob to *path* with raw os.write calls.
+
+    With *sync*, the data is flushed to disk before returning.
+    """
+    fd = os.open(path, _WRITE_FLAGS, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        if sync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _replace_file(path, data):
+    """Write *data* to a temp file next to *path*, then rename it over
+    *path*, so a failed save never leaves a truncated file behind."""
+    tmp = path + ".tmp"
+    try:
+        _write_bytes(tmp, data, sync=True)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _unlink_if_input(out_path, in_paths):
+    """Remove *out_path* if it is a hard link to one of *in_paths*.
+
+    ffmpeg -y truncates its output in place, which would also wipe the
+    linked input. Raises ValueError if the output is an input's only name.
+    """
+    try:
+        out = os.stat(out_path)
+    except OSError:
+        return
+    for p in in_paths:
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        if (st.st_ino, st.st_dev) == (out.st_ino, out.st_dev):
+            if out.st_nlink < 2:
+                raise ValueError("Output file is one of the input files")
+            os.remove(out_path)
+            return
+
+
+# Base64 text decoded per write; a multiple of 4 so chunks split cleanly.
+_B64_DECODE_CHUNK = 1024 * 1024
+
+
+def _write_b64(path, b64_data):
+    """Decode base64 text into *path* a chunk at a time.
+
+    An optional ``data:...;base64,`` prefix is skipped.
+    """
+    start = b64_data.find(",") + 1 if b64_data.startswith("data:") else 0
+    fd = os.open(path, _WRITE_FLAGS, 0o666)
+    try:
+        for i in range(start, len(b64_data), _B64_DECODE_CHUNK):
+            view = memoryview(_b64.b64decode(b64_data[i:i + _B64_DECODE_CHUNK]))
+            while view:
+                view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+# ── Colour-correction kernels ────────────────────────────────────────────
+# Every step of the underwater correction before contrast/saturation is a
+# per-channel function of the 8-bit input value, so the whole chain is
+# folded into one 256-entry lookup table per channel.
+def _hist_percentiles(hist, qs):
+    """Per-channel ``np.percentile`` (linear method) from (3, 256) counts.
+
+    Exact for 8-bit data: the sorted-order values either side of each
+    virtual index are read off the cumulative histogram, and the
+    interpolation mirrors NumPy's, so no pixel is ever sorted.
+    """
+    import numpy as np
+
+    cdf = np.cumsum(hist, axis=1)
+    n = int(cdf[0, -1])
+    q = np.asarray(qs, dtype=np.float64) / 100
+    virtual = (n - 1) * q
+    below = np.floor(virtual)
+    t = virtual - below
+    below = np.clip(below, 0, n - 1).astype(np.int64)
+    above = np.clip(below + 1, 0, n - 1)
+    out = np.empty((len(q), 3), dtype=np.float64)
+    for ch in range(3):
+        a = np.searchsorted(cdf[ch], below, side="right").astype(np.float64)
+        b = np.searchsorted(cdf[ch], above, side="right").astype(np.float64)
+        diff = b - a
+        out[:, ch] = np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+    return out
+
+
+def _underwater_luts(hist, strength):
+    """Build (3, 256) uint8 LUTs for stretch, gray-world WB and gamma.
+
+    *hist* is the 768-entry RGB histogram from ``Image.histogram()``.
+    """
+    import numpy as np
+
+    levels = np.arange(256, dtype=np.float64)
+    luts = np.empty((3, 256), dtype=np.float64)
+    counts = np.asarray(hist, dtype=np.int64).reshape(3, 256)
+    hist = counts.astype(np.float64)
+
+    # --- Percentile-based histogram stretch per channel ---
+    lo, hi = _hist_percentiles(counts, [5, 95])
+    span = hi - lo
+    # Channels with (almost) no spread are left unstretched
+    stretch = np.where(span > 1, strength, 0.0)[:, None]
+    stretched = (levels - lo[:, None]) / np.where(span > 1, span, 1.0)[:, None] * 255.0
+    np.multiply(stretch, stretched - levels, out=luts)
+    luts += levels
+    np.clip(luts, 0, 255, out=luts)
+
+    # --- Gray-world white balance ---
+    # Channel means of the stretched image, taken from the histograms
+    avgs = (hist * luts).sum(axis=1) / hist[0].sum()
+    overall_avg = avgs.sum() / 3.0
+    for ch, ch_avg in enumerate(avgs):
+        if ch_avg > 0:
+            ratio = overall_avg / ch_avg
+            # Blend toward balanced by strength
+            luts[ch] *= 1.0 + strength * (ratio - 1.0)
+    np.clip(luts, 0, 255, out=luts)
+
+    # --- Gamma correction to restore red / suppress blue ---
+    # gamma < 1 brightens (boosts), gamma > 1 darkens (suppresses)
+    r_gamma = 1.0 / (1.0 + strength * 0.8)   # max ~0.56 at s=1 -> red boost
+    b_gamma = 1.0 + strength * 0.3             # max 1.3 at s=1 -> blue suppress
+    luts[0] = np.power(luts[0] / 255.0, r_gamma) * 255.0
+    luts[2] = np.power(luts[2] / 255.0, b_gamma) * 255.0
+    np.clip(luts, 0, 255, out=luts)
+    return luts.astype(np.uint8)
+
+
+def _apply_luts(arr, luts):
+    """Map each channel of uint8 *arr* through its LUT, in place."""
+    for ch in range(3):
+        arr[:, :, ch] = luts[ch][arr[:, :, ch]]
+
+
+def _blend_lut(base, top, factor):
+    """``Image.blend(base, top, factor)`` over 8-bit values, as a table.
+
+    Uses Pillow's float32 arithmetic, truncation and clipping, so lookups
+    give exactly what the blend would.
+    """
+    import numpy as np
+
+    base = np.asarray(base, dtype=np.float32)
+    top = np.asarray(top, dtype=np.float32)
+    temp = base + np.float32(factor) * (top - base)
+    return np.clip(temp, 0, 255).astype(np.uint8)
+
+
+def _underwater_finish(arr, luts, contrast, saturation):
+    """Apply *luts* (if any) to uint8 *arr*, then ImageEnhance contrast
+    and colour.
+
+    Returns a PIL image. Pillow fallback for the Numba kernels below.
+    """
+    from PIL import Image, ImageEnhance
+
+    if luts is not None:
+        _apply_luts(arr, luts)
+    img = Image.fromarray(arr)
+    img = ImageEnhance.Contrast(img).enhance(contrast)
+    return ImageEnhance.Color(img).enhance(saturation)
+
+
+if njit is not None:
+    # Each kernel already uses every core, and the work-queue threading
+    # layer must not be entered from two threads at once
+    _KERNEL_LOCK = threading.Lock()
+
+    # Pillow's RGB -> L conversion: (19595 R + 38470 G + 7471 B + 0x8000) >> 16
+
+    @njit(parallel=True, cache=_JIT_CACHE)
+    def _lut_luma_rows(arr, luts, rows):
+        """Map *arr* through *luts* in place; rows[y] = that row's luma sum."""
+        h, w = arr.shape[0], arr.shape[1]
+        for y in prange(h):
+            acc = 0
+            for x in range(w):
+                r = luts[0, arr[y, x, 0]]
+                g = luts[1, arr[y, x, 1]]
+                b = luts[2, arr[y, x, 2]]
+                arr[y, x, 0] = r
+                arr[y, x, 1] = g
+                arr[y, x, 2] = b
+                acc += (int(r) * 19595 + int(g) * 38470
+                        + int(b) * 7471 + 0x8000) >> 16
+            rows[y] = acc
+
+    @njit(parallel=True, cache=_JIT_CACHE)
+    def _contrast_saturate(arr, clut, sat):
+        """Contrast through *clut*, then blend with luma via sat[luma, v]."""
+        h, w = arr.shape[0], arr.shape[1]
+        for y in prange(h):
+            for x in range(w):
+                r = clut[arr[y, x, 0]]
+                g = clut[arr[y, x, 1]]
+                b = clut[arr[y, x, 2]]
+                luma = (int(r) * 19595 + int(g) * 38470
+                        + int(b) * 7471 + 0x8000) >> 16
+                arr[y, x, 0] = sat[luma, r]
+                arr[y, x, 1] = sat[luma, g]
+                arr[y, x, 2] = sat[luma, b]
+
+    def _underwater_finish(arr, luts, contrast, saturation):  # noqa: F811
+        """Same result as the Pillow version, in two passes over *arr*."""
+        import numpy as np
+        from PIL import Image
+
+        if luts is None:
+            luts = np.tile(np.arange(256, dtype=np.uint8), (3, 1))
+        rows = np.empty(arr.shape[0], dtype=np.int64)
+        with _KERNEL_LOCK:
+            _lut_luma_rows(arr, luts, rows)
+        # ImageEnhance.Contrast blends toward the rounded mean luma
+        mean = int(rows.sum() / (arr.shape[0] * arr.shape[1]) + 0.5)
+        levels = np.arange(256)
+        clut = _blend_lut(mean, levels, contrast)
+        # ImageEnhance.Color blends each pixel toward its own luma
+        sat = _blend_lut(levels[:, None], levels[None, :], saturation)
+        with _KERNEL_LOCK:
+            _contrast_saturate(arr, clut, sat)
+        return Image.fromarray(arr)
+
+    def _warm_kernels():
+        """Compile (or load from cache) the kernels on a 1x1 image."""
+        import numpy as np
+
+        _underwater_finish(np.zeros((1, 1, 3), dtype=np.uint8), None, 1.0, 1.0)
+
+
+@functools.cache
+def _empty_dashboard_json():
+    """The "New Project" response; its inputs never change, so build once."""
+    dashboard_html = generate_html([], {"serial": "N/A"}, [])
+    return _json_dumps({"success": True, "html": dashboard_html})
+
+
+class _PicHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the files registered in ``server.files`` (token -> path).
+
+    Project pictures reach the page as raw bytes this way instead of as
+    base64 strings over the JS bridge. Only registered files are served,
+    each under a random token, and the server listens on loopback only.
+    """
+
+    def _cors(self):
+        # Only the app page that asked for the URLs may read the bytes
+        origin = self.headers.get("Origin")
+        if origin and origin == self.server.origin:
+            self.send_header("Access-Control-Allow-Origin", origin)
+            self.send_header("Vary", "Origin")
+            # Chromium's Private Network Access preflight for loopback fetches
+            self.send_header("Access-Control-Allow-Private-Network", "true")
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self._cors()
+        self.send_header("Access-Control-Allow-Methods", "GET")
+        self.end_headers()
+
+    def do_GET(self):
+        path = self.server.files.get(self.path.lstrip("/"))
+        try:
+            f = open(path, "rb") if path else None
+        except OSError:
+            f = None
+        if f is None:
+            self.send_error(404)
+            return
+        with f:
+            self.send_response(200)
+            self._cors()
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.connection.sendfile(f)
+
+    def log_message(self, format, *args):
+        pass
+
+
 # ── Python ↔ JavaScript API ─────────────────────────────────────────────
 class Api:
     def __init__(self):
         self.window = None
+        self._h264_args = None
+        if njit is not None:
+            # JIT the colour kernels off the UI path before the first photo
+            threading.Thread(target=_warm_kernels, daemon=True).start()
+        # Picture reads for load_pic_files; file I/O and pybase64 release the GIL
+        self._read_pool = ThreadPoolExecutor(max_workers=8)
+        # Loopback server for project pictures, started on first use
+        self._pic_server = None
+        self._pic_lock = threading.Lock()
+        # Kept-alive HTTPS connections, one set per worker thread
+        self._http = threading.local()
+        self._drop_dir = None
+        self._ffmpeg = None
+        # folder name -> (resolved path or "", time of lookup)
+        self._folder_cache = {}
+        # (built at, names, drives) listings searched by resolve_folder
+        self._folder_index = None
+        # (db path, mtime, size) -> extracted dive log
+        self._db_cache = {}
+        # (project path, mtime, size) -> load_project response
+        self._project_cache = {}
+        # digest of (dives, computerInfo, trips) -> gzipped dashboard HTML
+        self._html_cache = {}
+        # APP_DIR subfolder name -> path, once created this session
+        self._app_dirs = {}
+        # Parsed api_config.json and the mtime it was read at
+        self._cfg = None
+        self._cfg_mtime = 0
+        # ((image path, mtime, size), data-URI) of the default background
+        self._bg_cache = None
+        # Background choice not yet written to background_config.json
+        self._bg_pending = None
+        self._bg_timer = None
+        self._bg_lock = threading.Lock()
+        atexit.register(self._flush_bg_config)
 
     def choose_file(self):
         result = self.window.create_file_dialog(
@@ -75,39 +609,32 @@ class Api:
     def save_dropped_file(self, filename, b64_data):
         """Persist a file received from HTML5 drag-and-drop (base64)."""
         try:
-            data = base64.b64decode(b64_data)
-            tmp = os.path.join(tempfile.gettempdir(), "mydivelog_drop")
-            os.makedirs(tmp, exist_ok=True)
-            out = os.path.join(tmp, filename)
-            with open(out, "wb") as f:
-                f.write(data)
+            data = _b64.b64decode(b64_data)
+            if self._drop_dir is None:
+                tmp = os.path.join(tempfile.gettempdir(), "mydivelog_drop")
+                os.makedirs(tmp, exist_ok=True)
+                self._drop_dir = tmp
+            out = os.path.join(self._drop_dir, filename)
+            _write_bytes(out, data)
             return out
         except Exception:
             return None
 
-    def convert_raw(self, b64_data):
-        """Convert a RAW image (base64) to JPG via rawpy, return data-URI."""
+    def convert_raw(self, b64_data, preview=False):
+        """Convert a RAW image (base64) to JPG via rawpy, return data-URI.
+
+        With *preview*, LibRaw's half-size mode builds each pixel straight
+        from one 2x2 Bayer block: no demosaic and a quarter of the pixels,
+        still larger than 1920x1080 for any recent camera.
+        """
         try:
             import rawpy
-            from PIL import Image
 
-            raw_bytes = base64.b64decode(b64_data)
-            tmp = os.path.join(tempfile.gettempdir(), "mydivelog_raw_tmp")
-            os.makedirs(tmp, exist_ok=True)
-            tmp_file = os.path.join(tmp, "convert.orf")
-            with open(tmp_file, "wb") as f:
-                f.write(raw_bytes)
+            raw_bytes = _b64.b64decode(b64_data)
+            with rawpy.imread(io.BytesIO(raw_bytes)) as raw:
+                rgb = raw.postprocess(half_size=bool(preview))
 
-            raw = rawpy.imread(tmp_file)
-            rgb = raw.postprocess()
-            raw.close()
-            os.unlink(tmp_file)
-
-            img = Image.fromarray(rgb)
-            buf = io.BytesIO()
-            img.save(buf, format="JPEG", quality=85)
-            b64_jpg = base64.b64encode(buf.getvalue()).decode("ascii")
-            return "data:image/jpeg;base64," + b64_jpg
+            return _jpeg_datauri(rgb, 85)
         except Exception:
             return ""
 
@@ -120,43 +647,27 @@ class Api:
         """
         try:
             import rawpy
-            from PIL import Image, ImageEnhance
-            import numpy as np
 
             strength = max(0.0, min(1.0, float(strength)))
 
-            raw_bytes = base64.b64decode(b64_data)
-            tmp = os.path.join(tempfile.gettempdir(), "mydivelog_raw_tmp")
-            os.makedirs(tmp, exist_ok=True)
-            tmp_file = os.path.join(tmp, "convert_uw.orf")
-            with open(tmp_file, "wb") as f:
-                f.write(raw_bytes)
-
-            raw = rawpy.imread(tmp_file)
+            raw_bytes = _b64.b64decode(b64_data)
             # Underwater WB: interpolate from neutral [1,1,1,1] toward corrected
             r_wb = 1.0 + strength * 0.6   # max 1.6 at strength=1
             b_wb = 1.0 - strength * 0.15  # min 0.85 at strength=1
-            rgb = raw.postprocess(
-                use_camera_wb=False,
-                use_auto_wb=False,
-                user_wb=[r_wb, 1.0, b_wb, 1.0],
-                no_auto_bright=False,
-            )
-            raw.close()
-            os.unlink(tmp_file)
-
-            img = Image.fromarray(rgb)
+            with rawpy.imread(io.BytesIO(raw_bytes)) as raw:
+                rgb = raw.postprocess(
+                    use_camera_wb=False,
+                    use_auto_wb=False,
+                    user_wb=[r_wb, 1.0, b_wb, 1.0],
+                    no_auto_bright=False,
+                )
 
             # Mild contrast and saturation, scaled by strength (no second channel boost)
             contrast = 1.0 + strength * 0.06   # max 1.06
             saturation = 1.0 + strength * 0.08  # max 1.08
-            img = ImageEnhance.Contrast(img).enhance(contrast)
-            img = ImageEnhance.Color(img).enhance(saturation)
+            img = _underwater_finish(rgb, None, contrast, saturation)
 
-            buf = io.BytesIO()
-            img.save(buf, format="JPEG", quality=90)
-            b64_jpg = base64.b64encode(buf.getvalue()).decode("ascii")
-            return "data:image/jpeg;base64," + b64_jpg
+            return _jpeg_datauri(img, 90, progressive=True)
         except Exception:
             return ""
 
@@ -168,64 +679,30 @@ class Api:
             strength: Correction intensity from 0.0 (none) to 1.0 (full). Default 0.5.
         """
         try:
-            from PIL import Image, ImageEnhance
+            from PIL import Image
             import numpy as np
 
             strength = max(0.0, min(1.0, float(strength)))
-            if b64_data.startswith("data:"):
-                b64_data = b64_data.split(",", 1)[1]
-            img_bytes = base64.b64decode(b64_data)
-            img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-
-            arr = np.array(img, dtype=np.float32)
-
-            # --- Percentile-based histogram stretch per channel ---
-            for ch in range(3):
-                lo = np.percentile(arr[:, :, ch], 5)
-                hi = np.percentile(arr[:, :, ch], 95)
-                if hi - lo > 1:
-                    stretched = (arr[:, :, ch] - lo) / (hi - lo) * 255.0
-                    arr[:, :, ch] = arr[:, :, ch] + strength * (stretched - arr[:, :, ch])
-
-            arr = np.clip(arr, 0, 255)
-
-            # --- Gray-world white balance ---
-            r_avg = arr[:, :, 0].mean()
-            g_avg = arr[:, :, 1].mean()
-            b_avg = arr[:, :, 2].mean()
-            overall_avg = (r_avg + g_avg + b_avg) / 3.0
-
-            for ch, ch_avg in enumerate([r_avg, g_avg, b_avg]):
-                if ch_avg > 0:
-                    ratio = overall_avg / ch_avg
-                    # Blend toward balanced by strength
-                    effective_ratio = 1.0 + strength * (ratio - 1.0)
-                    arr[:, :, ch] = arr[:, :, ch] * effective_ratio
-
-            arr = np.clip(arr, 0, 255)
-
-            # --- Gamma correction to restore red / suppress blue ---
-            # gamma < 1 brightens (boosts), gamma > 1 darkens (suppresses)
-            r_gamma = 1.0 / (1.0 + strength * 0.8)   # max ~0.56 at s=1 -> red boost
-            b_gamma = 1.0 + strength * 0.3             # max 1.3 at s=1 -> blue suppress
-            arr_norm = arr / 255.0
-            arr_norm[:, :, 0] = np.power(arr_norm[:, :, 0], r_gamma)
-            arr_norm[:, :, 2] = np.power(arr_norm[:, :, 2], b_gamma)
-            arr = arr_norm * 255.0
-            arr = np.clip(arr, 0, 255)
-
-            img = Image.fromarray(arr.astype(np.uint8))
+            img_bytes = _decode_data_uri(b64_data)
+            img = Image.open(io.BytesIO(img_bytes))
+            if strength == 0 and img.format == "JPEG":
+                # Nothing to correct: hand back the original, no re-encode
+                if b64_data.startswith("data:"):
+                    return b64_data
+                return "data:image/jpeg;base64," + b64_data
+            img = img.convert("RGB")
+
+            # Channel statistics come from PIL's histogram (computed in C),
+            # so no float copy of the image is ever made
+            arr = np.array(img)
+            luts = _underwater_luts(img.histogram(), strength)
 
             # --- Mild contrast and saturation, scaled by strength ---
             contrast = 1.0 + strength * 0.08   # max 1.08
             saturation = 1.0 + strength * 0.10  # max 1.10
-            img = ImageEnhance.Contrast(img).enhance(contrast)
-            img = ImageEnhance.Color(img).enhance(saturation)
+            img = _underwater_finish(arr, luts, contrast, saturation)
 
-            buf = io.BytesIO()
-            img.save(buf, format="JPEG", quality=90)
-            b64_jpg = base64.b64encode(buf.getvalue()).decode("ascii")
-            return "data:image/jpeg;base64," + b64_jpg
+            return _jpeg_datauri(img, 90, progressive=True)
         except Exception:
             return ""
 
@@ -233,11 +710,33 @@ class Api:
     def _api_key_path(self):
         return os.path.join(APP_DIR, "api_config.json")
 
+    def _load_cfg(self):
+        """api_config.json as a dict; re-read only when its mtime changes."""
+        path = self._api_key_path()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return {}
+        if self._cfg is None or mtime != self._cfg_mtime:
+            try:
+                with open(path, "r") as f:
+                    cfg = json.load(f)
+            except Exception:
+                return {}
+            self._cfg, self._cfg_mtime = cfg, mtime
+        return self._cfg
+
+    def _save_cfg(self, key, value):
+        cfg = dict(self._load_cfg())
+        cfg[key] = value
+        path = self._api_key_path()
+        with open(path, "w") as f:
+            json.dump(cfg, f)
+        self._cfg, self._cfg_mtime = cfg, os.stat(path).st_mtime_ns
+
     def _get_api_key(self):
         try:
-            with open(self._api_key_path(), "r") as f:
-                cfg = json.load(f)
-            return cfg.get("anthropic_api_key", "")
+            return self._load_cfg().get("anthropic_api_key", "")
         except Exception:
             return ""
 
@@ -246,15 +745,7 @@ class Api:
 
     def save_api_key(self, key):
         try:
-            cfg = {}
-            try:
-                with open(self._api_key_path(), "r") as f:
-                    cfg = json.load(f)
-            except Exception:
-                pass
-            cfg["anthropic_api_key"] = key.strip()
-            with open(self._api_key_path(), "w") as f:
-                json.dump(cfg, f)
+            self._save_cfg("anthropic_api_key", key.strip())
             return "ok"
         except Exception:
             return ""
@@ -262,9 +753,7 @@ class Api:
     # ── OpenAI API support ────────────────────────────────────────────
     def _get_openai_key(self):
         try:
-            with open(self._api_key_path(), "r") as f:
-                cfg = json.load(f)
-            return cfg.get("openai_api_key", "")
+            return self._load_cfg().get("openai_api_key", "")
         except Exception:
             return ""
 
@@ -273,53 +762,86 @@ class Api:
 
     def save_openai_key(self, key):
         try:
-            cfg = {}
-            try:
-                with open(self._api_key_path(), "r") as f:
-                    cfg = json.load(f)
-            except Exception:
-                pass
-            cfg["openai_api_key"] = key.strip()
-            with open(self._api_key_path(), "w") as f:
-                json.dump(cfg, f)
+            self._save_cfg("openai_api_key", key.strip())
             return "ok"
         except Exception:
             return ""
 
     def get_preferred_provider(self):
         try:
-            with open(self._api_key_path(), "r") as f:
-                cfg = json.load(f)
-            return cfg.get("preferred_provider", "anthropic")
+            return self._load_cfg().get("preferred_provider", "anthropic")
         except Exception:
             return "anthropic"
 
     def save_preferred_provider(self, provider):
         try:
-            cfg = {}
-            try:
-                with open(self._api_key_path(), "r") as f:
-                    cfg = json.load(f)
-            except Exception:
-                pass
-            cfg["preferred_provider"] = provider
-            with open(self._api_key_path(), "w") as f:
-                json.dump(cfg, f)
+            self._save_cfg("preferred_provider", provider)
             return "ok"
         except Exception:
             return ""
 
+    def _post_json(self, host, path, payload, headers):
+        """POST compact JSON over a kept-alive HTTPS connection.
+
+        Returns (status, body bytes). If a reused connection turns out to
+        have been closed by the server, the request is retried once on a
+        new one; any other failure (including a timeout) is raised.
+        """
+        import http.client
+
+        # The payload carries a base64 photo; send it as compact bytes
+        body = _json_dumpb(payload)
+        headers = dict(headers)
+        headers["Content-Type"] = "application/json"
+        headers["Accept-Encoding"] = "identity"
+        conns = self._http.__dict__
+        while True:
+            conn = conns.get(host)
+            reused = conn is not None
+            if not reused:
+                conn = conns[host] = http.client.HTTPSConnection(host, timeout=30)
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                resp = conn.getresponse()
+                return resp.status, resp.read()
+            except Exception as e:
+                conn.close()
+                del conns[host]
+                # RemoteDisconnected is a ConnectionResetError
+                if not (reused and isinstance(e, (ConnectionResetError, BrokenPipeError))):
+                    raise
+
+    def _shrink_for_vision(self, b64_data, media_type, max_dim=1280):
+        """Downscale an oversized image before it is sent to a vision API.
+
+        Returns (b64_data, media_type). Images already within *max_dim*
+        are passed through untouched; only their header is read.
+        """
+        try:
+            from PIL import Image
+
+            img = Image.open(io.BytesIO(_b64.b64decode(b64_data)))
+            if max(img.size) <= max_dim:
+                return b64_data, media_type
+            img = img.convert("RGB")
+            img.thumbnail((max_dim, max_dim), Image.LANCZOS)
+            buf = io.BytesIO()
+            img.save(buf, format="JPEG", quality=82)
+            return _b64encode_str(buf.getbuffer()), "image/jpeg"
+        except Exception:
+            return b64_data, media_type
+
     def identify_marine_life_openai(self, b64_data, media_type="image/jpeg"):
         """Send image to OpenAI GPT-4o API for marine life identification."""
-        from urllib.request import Request, urlopen
-        from urllib.error import HTTPError, URLError
+        import http.client
 
         api_key = self._get_openai_key()
         if not api_key:
             return json.dumps({"error": "No OpenAI API key configured."})
 
         try:
-            payload = json.dumps({
+            b64_data, media_type = self._shrink_for_vision(b64_data, media_type)
+            payload = {
                 "model": "gpt-4o",
                 "max_tokens": 1024,
                 "messages": [{
@@ -339,20 +861,16 @@ class Api:
                         }
                     ]
                 }]
-            }).encode("utf-8")
-
-            req = Request(
-                "https://api.openai.com/v1/chat/completions",
-                data=payload,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {api_key}",
-                },
-                method="POST",
-            )
+            }
 
-            with urlopen(req, timeout=30) as resp:
-                body = json.loads(resp.read().decode("utf-8"))
+            status, raw = self._post_json(
+                "api.openai.com", "/v1/chat/completions", payload,
+                {"Authorization": f"Bearer {api_key}"},
+            )
+            if status >= 400:
+                err_body = raw.decode("utf-8", errors="replace")[:300]
+                return json.dumps({"error": f"API error ({status}): {err_body}"})
+            body = _json_loads(raw)
 
             text = ""
             for choice in body.get("choices", []):
@@ -361,25 +879,22 @@ class Api:
 
             return json.dumps({"result": text})
 
-        except HTTPError as e:
-            err_body = e.read().decode("utf-8", errors="replace")[:300]
-            return json.dumps({"error": f"API error ({e.code}): {err_body}"})
-        except URLError as e:
-            return json.dumps({"error": f"Connection error: {e.reason}"})
+        except (http.client.HTTPException, OSError) as e:
+            return json.dumps({"error": f"Connection error: {e}"})
         except Exception as e:
             return json.dumps({"error": str(e)})
 
     def identify_marine_life(self, b64_data, media_type="image/jpeg"):
         """Send image to Claude API for marine life identification."""
-        from urllib.request import Request, urlopen
-        from urllib.error import HTTPError, URLError
+        import http.client
 
         api_key = self._get_api_key()
         if not api_key:
             return json.dumps({"error": "No API key configured."})
 
         try:
-            payload = json.dumps({
+            b64_data, media_type = self._shrink_for_vision(b64_data, media_type)
+            payload = {
                 "model": "claude-sonnet-4-5-20250929",
                 "max_tokens": 1024,
                 "messages": [{
@@ -401,21 +916,16 @@ class Api:
                         }
                     ]
                 }]
-            }).encode("utf-8")
-
-            req = Request(
-                "https://api.anthropic.com/v1/messages",
-                data=payload,
-                headers={
-                    "Content-Type": "application/json",
-                    "x-api-key": api_key,
-                    "anthropic-version": "2023-06-01",
-                },
-                method="POST",
-            )
+            }
 
-            with urlopen(req, timeout=30) as resp:
-                body = json.loads(resp.read().decode("utf-8"))
+            status, raw = self._post_json(
+                "api.anthropic.com", "/v1/messages", payload,
+                {"x-api-key": api_key, "anthropic-version": "2023-06-01"},
+            )
+            if status >= 400:
+                err_body = raw.decode("utf-8", errors="replace")[:300]
+                return json.dumps({"error": f"API error ({status}): {err_body}"})
+            body = _json_loads(raw)
 
             # Extract text from response
             text = ""
@@ -425,11 +935,8 @@ class Api:
 
             return json.dumps({"result": text})
 
-        except HTTPError as e:
-            err_body = e.read().decode("utf-8", errors="replace")[:300]
-            return json.dumps({"error": f"API error ({e.code}): {err_body}"})
-        except URLError as e:
-            return json.dumps({"error": f"Connection error: {e.reason}"})
+        except (http.client.HTTPException, OSError) as e:
+            return json.dumps({"error": f"Connection error: {e}"})
         except Exception as e:
             return json.dumps({"error": str(e)})
 
@@ -452,7 +959,7 @@ class Api:
                 return ""
             if not path.lower().endswith(".png"):
                 path += ".png"
-            img_bytes = base64.b64decode(b64_data)
+            img_bytes = _b64.b64decode(b64_data)
             with open(path, "wb") as f:
                 f.write(img_bytes)
             return path
@@ -502,21 +1009,32 @@ class Api:
             return ""
 
     # ── Sound file picker ─────────────────────────────────────────────
+    def _app_dir(self, name):
+        """Return APP_DIR/<name>, creating it on first use this session."""
+        d = self._app_dirs.get(name)
+        if d is None:
+            d = os.path.join(APP_DIR, name)
+            os.makedirs(d, exist_ok=True)
+            self._app_dirs[name] = d
+        return d
+
     def _sounds_dir(self):
         """Return the sounds folder path, creating it if needed."""
-        d = os.path.join(APP_DIR, "sounds")
-        os.makedirs(d, exist_ok=True)
-        return d
+        return self._app_dir("sounds")
 
     def list_sound_files(self):
         """Return list of {name, path} for sound files in the sounds dir."""
         d = self._sounds_dir()
-        exts = ('.wav', '.mp3', '.ogg', '.m4a', '.aac')
         files = []
         try:
-            for fn in sorted(os.listdir(d)):
-                if fn.lower().endswith(exts):
-                    files.append({"name": fn, "path": os.path.join(d, fn)})
+            with os.scandir(d) as it:
+                files = [
+                    {"name": e.name, "path": e.path}
+                    for e in it
+                    if os.path.splitext(e.name)[1].lower() in _SOUND_EXTS
+                    and e.is_file()
+                ]
+            files.sort(key=lambda f: f["name"])
         except Exception:
             pass
         return files
@@ -542,16 +1060,8 @@ class Api:
             if not os.path.isfile(file_path):
                 return ""
             ext = os.path.splitext(file_path)[1].lower()
-            mime_map = {
-                '.wav': 'audio/wav', '.mp3': 'audio/mpeg',
-                '.ogg': 'audio/ogg', '.m4a': 'audio/mp4',
-                '.aac': 'audio/aac',
-            }
-            mime = mime_map.get(ext, 'audio/wav')
-            with open(file_path, "rb") as f:
-                data = f.read()
-            b64 = base64.b64encode(data).decode("ascii")
-            return f"data:{mime};base64,{b64}"
+            mime = _SOUND_MIME.get(ext, 'audio/wav')
+            return _file_to_b64_datauri(file_path, mime)
         except Exception:
             return ""
 
@@ -559,10 +1069,30 @@ class Api:
     def save_video_blob(self, b64_data, dest_path):
         """Write base64-encoded video data to dest_path. Returns 'ok' or ''."""
         try:
-            video_bytes = base64.b64decode(b64_data)
             os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-            with open(dest_path, "wb") as f:
-                f.write(video_bytes)
+            # A leftover temp may be a hard link to an original video;
+            # unlink it rather than truncating through it
+            if os.path.lexists(dest_path):
+                os.remove(dest_path)
+            _write_b64(dest_path, b64_data)
+            return "ok"
+        except Exception:
+            return ""
+
+    def save_video_path(self, src_path, dest_path):
+        """Place the video at src_path at dest_path without sending it
+        through JS. The file is copied, never linked, so nothing written
+        to dest_path later can reach the original. Returns 'ok' or ''."""
+        import shutil
+        try:
+            if not os.path.isfile(src_path):
+                return ""
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            if os.path.lexists(dest_path):
+                if os.path.samefile(src_path, dest_path):
+                    return ""
+                os.remove(dest_path)
+            shutil.copyfile(src_path, dest_path)
             return "ok"
         except Exception:
             return ""
@@ -578,7 +1108,13 @@ class Api:
             return ""
 
     def _find_ffmpeg(self):
-        """Locate ffmpeg executable. Returns path or None."""
+        """Locate ffmpeg executable. Returns path or None.
+
+        A found path is cached for the session; a miss is retried so that
+        installing ffmpeg does not require restarting the app.
+        """
+        if self._ffmpeg:
+            return self._ffmpeg
         import shutil
         import glob as glob_mod
         ffmpeg = shutil.which("ffmpeg")
@@ -591,8 +1127,89 @@ class Api:
             matches = glob_mod.glob(pattern)
             if matches:
                 ffmpeg = matches[0]
+        self._ffmpeg = ffmpeg
         return ffmpeg
 
+    # Slides are stills, so skip x264's motion search effort
+    _X264_ARGS = ["-c:v", "libx264", "-preset", "ultrafast", "-tune", "stillimage"]
+    _NVENC_ARGS = ["-c:v", "h264_nvenc", "-preset", "p1"]
+
+    def _h264_encoder_args(self, ffmpeg):
+        """Return ffmpeg H.264 encoder args, preferring NVENC when it works.
+
+        The probe runs a one-frame test encode with the exact NVENC args
+        (listing encoders is not enough: NVENC can be compiled in without
+        a usable GPU, and older builds lack the p1-p7 presets) and is
+        cached for the rest of the session.
+        """
+        if self._h264_args is None:
+            import subprocess
+            args = self._X264_ARGS
+            try:
+                si = subprocess.STARTUPINFO()
+                si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+                si.wShowWindow = 0
+                probe = subprocess.run(
+                    [ffmpeg, "-hide_banner", "-loglevel", "error",
+                     "-f", "lavfi", "-i", "color=black:s=256x256",
+                     "-frames:v", "1", *self._NVENC_ARGS, "-f", "null", "-"],
+                    capture_output=True, timeout=30,
+                    startupinfo=si, creationflags=subprocess.CREATE_NO_WINDOW,
+                )
+                if probe.returncode == 0:
+                    args = self._NVENC_ARGS
+            except Exception:
+                pass
+            self._h264_args = args
+        return self._h264_args
+
+    def _run_ffmpeg(self, cmd, timeout=600, on_time=None):
+        """Run ffmpeg, draining stderr as it arrives and keeping only the tail.
+
+        *on_time*, if given, is called with the seconds of output encoded so
+        far, parsed from ffmpeg's progress lines. Returns (returncode,
+        stderr_tail); raises subprocess.TimeoutExpired after *timeout*.
+        """
+        import collections
+        import re
+        import subprocess
+
+        # Hide console window on Windows
+        si = subprocess.STARTUPINFO()
+        si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        si.wShowWindow = 0  # SW_HIDE
+        proc = subprocess.Popen(
+            cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            startupinfo=si, creationflags=subprocess.CREATE_NO_WINDOW,
+        )
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            proc.kill()
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        tail = collections.deque(maxlen=20)
+        time_re = re.compile(r"time=(\d+):(\d+):(\d+(?:\.\d+)?)")
+        try:
+            # Universal newlines also split ffmpeg's \r-terminated progress
+            stderr = io.TextIOWrapper(proc.stderr, encoding="utf-8", errors="replace")
+            for line in stderr:
+                tail.append(line)
+                if on_time:
+                    m = time_re.search(line)
+                    if m:
+                        h, mnt, sec = m.groups()
+                        on_time(int(h) * 3600 + int(mnt) * 60 + float(sec))
+            proc.wait()
+        finally:
+            timer.cancel()
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        return proc.returncode, "".join(tail)[-500:]
+
     def concatenate_videos(self, file_paths, output_path):
         """Concatenate video files using ffmpeg. Returns output path or error."""
         import subprocess
@@ -601,25 +1218,23 @@ class Api:
             return json.dumps({"error": "ffmpeg not found. Please install ffmpeg and add it to your PATH."})
         try:
             list_path = output_path + ".txt"
+            lines = []
+            for p in file_paths:
+                escaped = p.replace("'", "'\\''")
+                lines.append(f"file '{escaped}'\n")
+            _unlink_if_input(output_path, file_paths)
             with open(list_path, "w", encoding="utf-8") as f:
-                for p in file_paths:
-                    escaped = p.replace("'", "'\\''")
-                    f.write(f"file '{escaped}'\n")
-            si = subprocess.STARTUPINFO()
-            si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            si.wShowWindow = 0
-            result = subprocess.run(
+                f.write("".join(lines))
+            returncode, err = self._run_ffmpeg(
                 [ffmpeg, "-y", "-f", "concat", "-safe", "0",
                  "-i", list_path, "-c", "copy", output_path],
-                capture_output=True, text=True, timeout=600,
-                startupinfo=si, creationflags=subprocess.CREATE_NO_WINDOW,
             )
             try:
                 os.remove(list_path)
             except Exception:
                 pass
-            if result.returncode != 0:
-                return json.dumps({"error": result.stderr[-500:] if result.stderr else "ffmpeg failed"})
+            if returncode != 0:
+                return json.dumps({"error": err or "ffmpeg failed"})
             return json.dumps({"success": True, "path": output_path})
         except subprocess.TimeoutExpired:
             return json.dumps({"error": "ffmpeg timed out"})
@@ -635,7 +1250,7 @@ class Api:
             return json.dumps({"error": "ffmpeg not found. Please install ffmpeg and add it to your PATH."})
 
         try:
-            images = json.loads(images_json)
+            images = _json_loads(images_json)
             opts = json.loads(opts_json)
         except Exception:
             return json.dumps({"error": "Invalid input data"})
@@ -668,34 +1283,80 @@ class Api:
         except Exception as e:
             return json.dumps({"error": f"Save dialog error: {e}"})
 
-        # Decode images to temp dir (synchronous — fast)
-        # Normalize all to JPEG for consistent ffmpeg concat
+        # Decode images to temp dir (synchronous, in parallel)
+        # The concat demuxer needs a single codec, so PNGs are only
+        # re-encoded to JPEG when mixed with JPEGs; otherwise the original
+        # bytes are written untouched.
+        def is_png(src):
+            # Sniff the magic bytes from the first base64 characters rather
+            # than trusting the data-URI's declared type
+            try:
+                comma = src.index(",")
+                return _b64.b64decode(src[comma + 1:comma + 13]).startswith(b"\x89PNG")
+            except Exception:
+                return False
+
+        pngs = [
+            is_png(src) if src.startswith("data:") else None
+            for src in (img.get("src", "") for img in images)
+        ]
+        normalize_png = len({k for k in pngs if k is not None}) > 1
         tmp_dir = tempfile.mkdtemp(prefix="arrowcrab_ss_")
-        img_paths = []
-        for i, img in enumerate(images):
+
+        def fit_jpeg(data):
+            # Browser-picked images arrive at 1920x1080 already, but RAW
+            # conversions are camera-sized; shrink those here (libjpeg's
+            # DCT scaling keeps the decode cheap) so ffmpeg doesn't decode
+            # 20 MP frames
+            try:
+                from PIL import Image as PILImage
+            except ImportError:
+                return data
+            pil_img = PILImage.open(io.BytesIO(data))
+            if pil_img.width <= 1920 and pil_img.height <= 1080:
+                return data
+            pil_img.draft("RGB", (1920, 1080))
+            pil_img = pil_img.convert("RGB")
+            pil_img.thumbnail((1920, 1080), PILImage.LANCZOS)
+            buf = io.BytesIO()
+            pil_img.save(buf, format="JPEG", quality=88)
+            return buf.getvalue()
+
+        def decode_and_save(item):
+            i, img = item
             try:
                 src = img.get("src", "")
                 if not src or not src.startswith("data:"):
-                    continue
-                header, b64data = src.split(",", 1)
-                img_data = base64.b64decode(b64data)
-                is_png = "png" in header
-                if is_png:
+                    return None
+                b64data = src.split(",", 1)[1]
+                img_data = _b64.b64decode(b64data)
+                ext = ".png" if pngs[i] else ".jpg"
+                if ext == ".png" and normalize_png:
                     # Convert PNG to JPEG for consistent pixel format
                     try:
                         from PIL import Image as PILImage
                         pil_img = PILImage.open(io.BytesIO(img_data)).convert("RGB")
+                        # ffmpeg scales to fit 1920x1080 anyway; shrinking
+                        # first keeps this JPEG encode small
+                        pil_img.thumbnail((1920, 1080), PILImage.LANCZOS)
                         buf = io.BytesIO()
                         pil_img.save(buf, format="JPEG", quality=92)
                         img_data = buf.getvalue()
+                        ext = ".jpg"
                     except ImportError:
                         pass  # If PIL unavailable, use PNG as-is
-                img_file = os.path.join(tmp_dir, f"img_{i:04d}.jpg")
-                with open(img_file, "wb") as f:
-                    f.write(img_data)
-                img_paths.append(img_file)
+                elif ext == ".jpg":
+                    img_data = fit_jpeg(img_data)
+                img_file = os.path.join(tmp_dir, f"img_{i:04d}{ext}")
+                _write_bytes(img_file, img_data)
+                return img_file
             except Exception:
-                continue
+                return None
+
+        # libjpeg/libpng and file writes release the GIL, so threads scale
+        workers = max(1, min(len(images), os.cpu_count() or 1))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            img_paths = [p for p in pool.map(decode_and_save, enumerate(images)) if p]
 
         if not img_paths:
             import shutil as shutil_mod
@@ -705,26 +1366,41 @@ class Api:
         # Create concat demuxer file
         concat_file = os.path.join(tmp_dir, "concat.txt")
         total_duration = 0
+        lines = []
+        for idx, p in enumerate(img_paths):
+            escaped = p.replace("\\", "/").replace("'", "'\\''")
+            dur = title_duration if (idx == 0 and title_duration > 0) else interval_sec
+            lines.append(f"file '{escaped}'\nduration {dur}\n")
+            total_duration += dur
+        # The last image is listed again so its duration is honoured
+        lines.append(f"file '{escaped}'\n")
         with open(concat_file, "w", encoding="utf-8") as f:
-            for idx, p in enumerate(img_paths):
-                escaped = p.replace("\\", "/").replace("'", "'\\''")
-                dur = title_duration if (idx == 0 and title_duration > 0) else interval_sec
-                f.write(f"file '{escaped}'\n")
-                f.write(f"duration {dur}\n")
-                total_duration += dur
-            escaped = img_paths[-1].replace("\\", "/").replace("'", "'\\''")
-            f.write(f"file '{escaped}'\n")
+            f.write("".join(lines))
 
         # Build ffmpeg command
         has_audio = sound_path and os.path.isfile(sound_path)
+        if has_audio:
+            try:
+                _unlink_if_input(output_path, [sound_path])
+            except Exception as e:
+                import shutil as shutil_mod
+                shutil_mod.rmtree(tmp_dir, ignore_errors=True)
+                return json.dumps({"error": str(e)})
         cmd = [ffmpeg, "-y"]
         if has_audio:
             cmd.extend(["-stream_loop", "-1", "-i", sound_path])
         cmd.extend(["-f", "concat", "-safe", "0", "-i", concat_file])
-        vf = "scale=1920:1080:force_original_aspect_ratio=decrease,pad=1920:1080:(ow-iw)/2:(oh-ih)/2:color=black"
+        # format= right after scale makes one swscale pass do both the
+        # resize and the conversion to yuv420p; pad then works in yuv420p
+        vf = ("scale=1920:1080:force_original_aspect_ratio=decrease,format=yuv420p,"
+              "pad=1920:1080:(ow-iw)/2:(oh-ih)/2:color=black")
         if has_audio:
             cmd.extend(["-map", "1:v", "-map", "0:a"])
-        cmd.extend(["-vf", vf, "-c:v", "libx264", "-pix_fmt", "yuv420p", "-r", "30"])
+        cmd.extend(["-vf", vf])
+        enc_at = len(cmd)
+        enc_args = self._h264_encoder_args(ffmpeg)
+        cmd.extend(enc_args)
+        cmd.extend(["-pix_fmt", "yuv420p", "-r", "30"])
         if has_audio:
             cmd.extend(["-c:a", "aac", "-b:a", "192k"])
         else:
@@ -733,23 +1409,29 @@ class Api:
         cmd.append(output_path)
 
         # Start ffmpeg in background thread so UI stays responsive
-        self._mp4_status = {"state": "encoding", "output_path": output_path, "num_images": len(img_paths)}
+        self._mp4_status = {
+            "state": "encoding", "output_path": output_path,
+            "num_images": len(img_paths), "progress": 0.0,
+        }
+
+        def report_progress(seconds):
+            self._mp4_status["progress"] = round(min(1.0, seconds / total_duration), 3)
 
         def run_ffmpeg():
             try:
-                # Hide console window on Windows
-                si = subprocess.STARTUPINFO()
-                si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                si.wShowWindow = 0  # SW_HIDE
-                proc = subprocess.run(
-                    cmd, capture_output=True, text=True, timeout=600,
-                    startupinfo=si, creationflags=subprocess.CREATE_NO_WINDOW,
-                )
+                rc, err = self._run_ffmpeg(cmd, on_time=report_progress)
+                if enc_args is self._NVENC_ARGS and (
+                        rc != 0 or not os.path.isfile(output_path)
+                        or os.path.getsize(output_path) == 0):
+                    # NVENC passed the probe but failed on the real encode;
+                    # redo it with x264 and stop using NVENC this session
+                    self._h264_args = self._X264_ARGS
+                    cmd[enc_at:enc_at + len(enc_args)] = self._X264_ARGS
+                    rc, err = self._run_ffmpeg(cmd, on_time=report_progress)
                 if os.path.isfile(output_path) and os.path.getsize(output_path) > 0:
                     self._mp4_status = {"state": "done", "path": output_path}
                 else:
-                    err = proc.stderr[-500:] if proc.stderr else "ffmpeg failed"
-                    self._mp4_status = {"state": "error", "error": err}
+                    self._mp4_status = {"state": "error", "error": err or "ffmpeg failed"}
             except subprocess.TimeoutExpired:
                 self._mp4_status = {"state": "error", "error": "ffmpeg timed out (video may be too large)"}
             except Exception as e:
@@ -792,10 +1474,8 @@ class Api:
     def save_collection_file(self, b64_data, dest_path):
         """Write base64-encoded image data to dest_path."""
         try:
-            img_bytes = base64.b64decode(b64_data)
             os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-            with open(dest_path, "wb") as f:
-                f.write(img_bytes)
+            _write_b64(dest_path, b64_data)
             return "ok"
         except Exception:
             return ""
@@ -803,9 +1483,7 @@ class Api:
     # ── Background images ────────────────────────────────────────────────
     def _bg_images_dir(self):
         """Return the background images folder, creating it if needed."""
-        d = os.path.join(APP_DIR, "background_images")
-        os.makedirs(d, exist_ok=True)
-        return d
+        return self._app_dir("background_images")
 
     def _bg_config_path(self):
         return os.path.join(APP_DIR, "background_config.json")
@@ -814,48 +1492,75 @@ class Api:
         """Save a background image to background_images/ and persist config."""
         try:
             bg_dir = self._bg_images_dir()
-            # Decode the data URI
-            if b64_data.startswith("data:"):
-                b64_data = b64_data.split(",", 1)[1]
-            img_bytes = base64.b64decode(b64_data)
             path = os.path.join(bg_dir, filename)
-            with open(path, "wb") as f:
-                f.write(img_bytes)
-            # Save config so app remembers the background on next launch
-            with open(self._bg_config_path(), "w", encoding="utf-8") as f:
-                json.dump({"path": path}, f)
+            self._bg_cache = None
+            _write_b64(path, b64_data)
+            # Save config so app remembers the background on next launch;
+            # a burst of saves only writes the last choice
+            with self._bg_lock:
+                self._bg_pending = path
+                if self._bg_timer is not None:
+                    self._bg_timer.cancel()
+                self._bg_timer = threading.Timer(1.0, self._flush_bg_config)
+                self._bg_timer.daemon = True
+                self._bg_timer.start()
             return path
         except Exception:
             return ""
 
+    def _flush_bg_config(self):
+        """Write a pending background choice to background_config.json."""
+        with self._bg_lock:
+            path, self._bg_pending = self._bg_pending, None
+            if self._bg_timer is not None:
+                self._bg_timer.cancel()
+                self._bg_timer = None
+            if path is not None:
+                try:
+                    _replace_file(self._bg_config_path(), _json_dumpb({"path": path}))
+                except OSError:
+                    pass
+
     def get_default_background(self):
         """Return the saved default background as a data URI, or empty."""
         try:
-            cfg_path = self._bg_config_path()
-            if not os.path.exists(cfg_path):
-                return ""
-            with open(cfg_path, "r", encoding="utf-8") as f:
-                cfg = json.load(f)
-            img_path = cfg.get("path", "")
+            img_path = self._bg_pending
+            if img_path is None:
+                cfg_path = self._bg_config_path()
+                if not os.path.exists(cfg_path):
+                    return ""
+                with open(cfg_path, "r", encoding="utf-8") as f:
+                    cfg = json.load(f)
+                img_path = cfg.get("path", "")
             if not img_path or not os.path.exists(img_path):
                 return ""
+            st = os.stat(img_path)
+            key = (img_path, st.st_mtime_ns, st.st_size)
+            if self._bg_cache and self._bg_cache[0] == key:
+                return self._bg_cache[1]
             ext = os.path.splitext(img_path)[1].lower()
             mime = "image/png" if ext == ".png" else "image/jpeg"
-            with open(img_path, "rb") as f:
-                b64 = base64.b64encode(f.read()).decode("ascii")
-            return f"data:{mime};base64," + b64
+            uri = _file_to_b64_datauri(img_path, mime)
+            self._bg_cache = (key, uri)
+            return uri
         except Exception:
             return ""
 
     def clear_background_config(self):
         """Remove the saved background config."""
-        try:
-            cfg_path = self._bg_config_path()
-            if os.path.exists(cfg_path):
-                os.remove(cfg_path)
-            return "ok"
-        except Exception:
-            return ""
+        self._bg_cache = None
+        with self._bg_lock:
+            self._bg_pending = None
+            if self._bg_timer is not None:
+                self._bg_timer.cancel()
+                self._bg_timer = None
+            try:
+                cfg_path = self._bg_config_path()
+                if os.path.exists(cfg_path):
+                    os.remove(cfg_path)
+                return "ok"
+            except Exception:
+                return ""
 
     # ── Default project config ───────────────────────────────────────────
     def _default_project_config_path(self):
@@ -898,9 +1603,7 @@ class Api:
     # ── Save / Load project ─────────────────────────────────────────────
     def _projects_dir(self):
         """Return the default projects folder, creating it if needed."""
-        d = os.path.join(APP_DIR, "projects")
-        os.makedirs(d, exist_ok=True)
-        return d
+        return self._app_dir("projects")
 
     def save_project_json(self, json_str):
         """Prompt for save location and write project JSON."""
@@ -918,11 +1621,27 @@ class Api:
                 return ""
             if not path.lower().endswith(".json"):
                 path += ".json"
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(json_str)
+            # The picture manifest goes to a sidecar so opening a project
+            # only has to parse dives/trips before the dashboard renders
+            proj = _json_loads(json_str)
+            pictures = proj.pop("pictures", None)
+            if pictures is not None:
+                pics_path = _pictures_sidecar(path)
+                _replace_file(pics_path, _json_dumpb(pictures))
+                proj["picturesFile"] = os.path.basename(pics_path)
+            # Store the rendered dashboard too, so opening the project can
+            # skip generate_html
+            try:
+                proj["htmlGz"] = self._dashboard_gz(proj)
+                proj["htmlRenderer"] = RENDERER_VERSION
+            except Exception:
+                proj.pop("htmlGz", None)
+                proj.pop("htmlRenderer", None)
+            _replace_file(path, _json_dumpb(proj))
             # Ask user if this should be the default project (native dialog)
+            if sys.platform != "win32":
+                return path
             try:
-                import ctypes
                 MB_YESNO = 0x04
                 MB_ICONQUESTION = 0x20
                 IDYES = 6
@@ -948,6 +1667,71 @@ class Api:
         except Exception:
             return ""
 
+    def _project_response(self, path):
+        """Read a project file and build the JSON response for the dashboard.
+
+        Responses are kept per (path, mtime, size), so reopening an
+        unchanged project skips the parse and the HTML generation.
+        """
+        self._forget_pic_urls()
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        hit = self._project_cache.get(key)
+        if hit is None:
+            hit = self._build_project_response(path)
+            _cache_put(self._project_cache, key, hit, 4)
+        return hit
+
+    def _dashboard_gz(self, proj):
+        """Return gzipped dashboard HTML for a project's dives/trips.
+
+        A project's stored htmlGz is reused when it was rendered by this
+        RENDERER_VERSION, and remembered by content, so saving a project
+        that was just opened doesn't render it again.
+        """
+        import hashlib
+
+        parts = (proj["dives"], proj["computerInfo"], proj["trips"])
+        key = hashlib.sha1(_json_dumpb(parts)).digest()
+        html_gz = self._html_cache.get(key)
+        if html_gz is None:
+            html_gz = proj.get("htmlGz")
+            if not html_gz or proj.get("htmlRenderer") != RENDERER_VERSION:
+                html_gz = _gzip_b64(generate_html(*parts))
+            _cache_put(self._html_cache, key, html_gz, 4)
+        return html_gz
+
+    def _build_project_response(self, path):
+        meta = _load_json_file(path)
+        html_gz = self._dashboard_gz(meta)
+        resp = {
+            "success": True,
+            "htmlGz": html_gz,
+            "captions": meta.get("captions", {}),
+            "marineIds": meta.get("marineIds", {}),
+            "collections": meta.get("collections", {}),
+        }
+        if "pictures" in meta:
+            # Older projects embed the manifest inline
+            resp["pictures"] = meta["pictures"]
+        elif meta.get("picturesFile"):
+            resp["picturesFile"] = os.path.join(
+                os.path.dirname(path), meta["picturesFile"]
+            )
+        if meta.get("backgroundPath"):
+            resp["backgroundPath"] = meta["backgroundPath"]
+        if meta.get("background"):
+            resp["background"] = meta["background"]
+        return _json_dumps(resp)
+
+    def get_pictures_manifest(self, path):
+        """Return the picture manifest stored in a project's sidecar file."""
+        try:
+            with open(path, "rb") as f:
+                return f.read().decode("utf-8")
+        except Exception:
+            return "{}"
+
     def load_project(self):
         """Open a .json project file, return dashboard HTML + picture manifest."""
         try:
@@ -961,27 +1745,8 @@ class Api:
             )
             if not result or len(result) == 0:
                 return json.dumps({"error": "cancelled"})
-            path = result[0]
-            with open(path, "r", encoding="utf-8") as f:
-                meta = json.load(f)
-            dashboard_html = generate_html(
-                meta["dives"], meta["computerInfo"], meta["trips"]
-            )
-            resp = {
-                "success": True,
-                "html": dashboard_html,
-                "pictures": meta.get("pictures", {}),
-                "captions": meta.get("captions", {}),
-                "marineIds": meta.get("marineIds", {}),
-                "collections": meta.get("collections", {}),
-            }
-            if meta.get("backgroundPath"):
-                resp["backgroundPath"] = meta["backgroundPath"]
-            if meta.get("background"):
-                resp["background"] = meta["background"]
-            return json.dumps(resp)
+            return self._project_response(result[0])
         except Exception as e:
-            import traceback
             return json.dumps({"error": str(e), "traceback": traceback.format_exc()})
 
     def load_project_from_path(self, path):
@@ -989,26 +1754,8 @@ class Api:
         try:
             if not path or not os.path.isfile(path):
                 return json.dumps({"error": "File not found"})
-            with open(path, "r", encoding="utf-8") as f:
-                meta = json.load(f)
-            dashboard_html = generate_html(
-                meta["dives"], meta["computerInfo"], meta["trips"]
-            )
-            resp = {
-                "success": True,
-                "html": dashboard_html,
-                "pictures": meta.get("pictures", {}),
-                "captions": meta.get("captions", {}),
-                "marineIds": meta.get("marineIds", {}),
-                "collections": meta.get("collections", {}),
-            }
-            if meta.get("backgroundPath"):
-                resp["backgroundPath"] = meta["backgroundPath"]
-            if meta.get("background"):
-                resp["background"] = meta["background"]
-            return json.dumps(resp)
+            return self._project_response(path)
         except Exception as e:
-            import traceback
             return json.dumps({"error": str(e), "traceback": traceback.format_exc()})
 
     def load_pic_file(self, filepath):
@@ -1017,10 +1764,64 @@ class Api:
             if not os.path.exists(filepath):
                 return ""
             with open(filepath, "rb") as f:
-                return base64.b64encode(f.read()).decode("ascii")
+                if not os.fstat(f.fileno()).st_size:
+                    return ""
+                # Encode straight from the page cache instead of copying
+                # the whole photo into a bytes object first
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return _b64encode_str(mm)
         except Exception:
             return ""
 
+    def load_pic_files(self, paths):
+        """Read several picture files; return JSON mapping path -> base64."""
+        return _json_dumps(
+            dict(zip(paths, self._read_pool.map(self.load_pic_file, paths)))
+        )
+
+    def pic_urls(self, paths, origin=None):
+        """Return JSON mapping path -> loopback URL serving that file.
+
+        *origin* is the calling page's location.origin; only it is sent
+        CORS headers. Paths that are not files, or a server that cannot
+        start, are left out; the page falls back to load_pic_files for
+        those.
+        """
+        try:
+            with self._pic_lock:
+                if self._pic_server is None:
+                    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _PicHandler)
+                    server.daemon_threads = True
+                    server.files = {}
+                    server.tokens = {}
+                    server.origin = None
+                    threading.Thread(target=server.serve_forever, daemon=True).start()
+                    self._pic_server = server
+                server = self._pic_server
+                # An opaque ("null") origin could be any sandboxed page
+                if origin and origin != "null":
+                    server.origin = origin
+                base = "http://127.0.0.1:%d/" % server.server_address[1]
+                urls = {}
+                for p in paths:
+                    if not os.path.isfile(p):
+                        continue
+                    token = server.tokens.get(p)
+                    if token is None:
+                        token = server.tokens[p] = secrets.token_urlsafe(16)
+                        server.files[token] = p
+                    urls[p] = base + token
+            return _json_dumps(urls)
+        except Exception:
+            return "{}"
+
+    def _forget_pic_urls(self):
+        """Revoke every pic_urls token; called when another project opens."""
+        with self._pic_lock:
+            if self._pic_server is not None:
+                self._pic_server.files.clear()
+                self._pic_server.tokens.clear()
+
     def resolve_folder(self, folder_name):
         """Find the absolute path to a folder by searching common locations.
 
@@ -1028,87 +1829,152 @@ class Api:
         by finding where FolderName actually lives on disk.
         Returns the absolute path to the folder, or empty string.
         """
+        cached = self._folder_cache.get(folder_name)
+        if cached is not None:
+            path, stamp = cached
+            if path:
+                if os.path.isdir(path):
+                    return path
+            elif time.monotonic() - stamp < _FOLDER_MISS_TTL:
+                return ""
         try:
-            home = os.path.expanduser("~")
-            # Search common locations (shallow), then drives (one level deep)
-            search_dirs = [home]
-            for d in ["Pictures", "Desktop", "Downloads", "Documents",
-                       "Videos", "OneDrive", "OneDrive\\Pictures"]:
-                p = os.path.join(home, d)
-                if os.path.isdir(p):
-                    search_dirs.append(p)
-            # Add drive roots and their immediate children
-            for drive in ["C:\\", "D:\\", "E:\\", "F:\\"]:
-                if os.path.isdir(drive):
-                    search_dirs.append(drive)
-                    try:
-                        for entry in os.scandir(drive):
-                            if entry.is_dir():
-                                search_dirs.append(entry.path)
-                    except PermissionError:
-                        pass
-            for search in search_dirs:
-                candidate = os.path.join(search, folder_name)
-                if os.path.isdir(candidate):
-                    return candidate
-            return ""
+            path = self._scan_for_folder(folder_name)
         except Exception:
+            # A failed scan is not a miss: cache nothing, drop what was there
+            self._folder_cache.pop(folder_name, None)
             return ""
+        _cache_put(self._folder_cache, folder_name, (path, time.monotonic()),
+                   _FOLDER_CACHE_MAX)
+        return path
+
+    def _folder_roots(self, rebuild=False):
+        """Return (names, drives), the listings resolve_folder searches.
+
+        *names* maps each folder name found in home and its usual
+        subfolders to its path, earlier locations winning. *drives* holds
+        (names, children) per drive root, *children* being the subfolders
+        worth probing one level down. Reused for _FOLDER_INDEX_TTL seconds.
+        """
+        index = self._folder_index
+        if index and not rebuild and time.monotonic() - index[0] < _FOLDER_INDEX_TTL:
+            return index[1], index[2]
+        names = _list_dirs(os.path.expanduser("~"))
+        search_dirs = [names.get(os.path.normcase(d)) for d in (
+            "Pictures", "Desktop", "Downloads", "Documents", "Videos", "OneDrive")]
+        if search_dirs[-1]:
+            search_dirs.append(os.path.join(search_dirs[-1], "Pictures"))
+        # The listings are independent and mostly wait on the disk (or on
+        # spun-down drives), so they run side by side on the read pool
+        roots = _drive_roots()
+        listings = list(self._read_pool.map(
+            _list_dirs, [d for d in search_dirs if d] + roots))
+        for listing in listings[:len(listings) - len(roots)]:
+            for name, path in listing.items():
+                names.setdefault(name, path)
+        drives = [
+            (root, [p for p in root.values() if os.path.basename(p) not in _FOLDER_SKIP])
+            for root in listings[len(listings) - len(roots):]
+        ]
+        self._folder_index = (time.monotonic(), names, drives)
+        return names, drives
+
+    def _scan_for_folder(self, folder_name):
+        want = os.path.normcase(folder_name)
+        for rebuild in (False, True):
+            built = self._folder_index
+            names, drives = self._folder_roots(rebuild)
+            path = names.get(want)
+            if path and os.path.isdir(path):
+                return path
+
+            def probe(drive):
+                root, children = drive
+                path = root.get(want)
+                if path and os.path.isdir(path):
+                    return path
+                for child in children:
+                    candidate = os.path.join(child, folder_name)
+                    if os.path.isdir(candidate):
+                        return candidate
+                return ""
+
+            # Drives are probed concurrently; map keeps C: before D:
+            for path in self._read_pool.map(probe, drives):
+                if path:
+                    return path
+            if self._folder_index is not built:
+                break  # listings were just taken; the miss is real
+        return ""
 
     def generate_empty_dashboard(self):
         """Generate an empty dashboard for a new project."""
         try:
-            dashboard_html = generate_html([], {"serial": "N/A"}, [])
-            return json.dumps({"success": True, "html": dashboard_html})
+            self._forget_pic_urls()
+            return _empty_dashboard_json()
         except Exception as e:
             return json.dumps({"error": str(e)})
 
+    def _read_dive_log(self, db_path):
+        """Return (dives, computer_info, trips) for a dive log database.
+
+        Results are kept per (path, mtime, size), so importing the same
+        unchanged log again skips the SQLite extraction.
+        """
+        st = os.stat(db_path)
+        key = (os.path.abspath(db_path), st.st_mtime_ns, st.st_size)
+        hit = self._db_cache.get(key)
+        if hit is None:
+            conn = open_dive_log(db_path)
+            try:
+                dives = extract_dive_data(conn)
+                info = get_computer_info(conn)
+            finally:
+                conn.close()
+            hit = (dives, info, calculate_trip_stats(dives))
+            _cache_put(self._db_cache, key, hit, 4)
+        return hit
+
     def extract_dives_json(self, db_path):
         """Extract dives and trips from a .db file, return as JSON (no HTML)."""
         try:
             if not os.path.isfile(db_path):
                 return json.dumps({"error": f"File not found: {db_path}"})
-            dives = extract_dive_data(db_path)
-            computer_info = get_computer_info(db_path)
-            trips = calculate_trip_stats(dives)
-            return json.dumps({
+            dives, computer_info, trips = self._read_dive_log(db_path)
+            return _json_dumps({
                 "success": True,
                 "dives": dives,
                 "trips": trips,
                 "computerInfo": computer_info,
             })
         except Exception as e:
-            import traceback
             return json.dumps({"error": str(e), "traceback": traceback.format_exc()})
 
     def generate_dashboard(self, db_path):
         try:
             if not os.path.isfile(db_path):
                 return json.dumps({"error": f"File not found: {db_path}"})
+            self._forget_pic_urls()
 
-            dives = extract_dive_data(db_path)
-            computer_info = get_computer_info(db_path)
-            trips = calculate_trip_stats(dives)
+            dives, computer_info, trips = self._read_dive_log(db_path)
             dashboard_html = generate_html(dives, computer_info, trips)
 
-            return json.dumps(
+            return _json_dumps(
                 {
                     "success": True,
                     "diveCount": len(dives),
                     "tripCount": len(trips),
                     "serial": computer_info["serial"],
-                    "html": dashboard_html,
+                    "htmlGz": _gzip_b64(dashboard_html),
                 }
             )
         except Exception as e:
-            import traceback
-
             return json.dumps(
                 {"error": str(e), "traceback": traceback.format_exc()}
             )
 
 
 # ── HTML template ────────────────────────────────────────────────────────
+@functools.cache
 def _build_app_html():
     logo = _logo_data_uri()
 
@@ -1157,14 +2023,13 @@ iframe{{width:100%;height:100%;border:none}}
 var dash=document.getElementById('dash');
 dash.srcdoc={welcome_js};
 
-/* Check for default project, otherwise apply saved background to welcome */
+/* Check for default project, otherwise apply saved background to welcome.
+   pywebview fires pywebviewready once its API has been injected */
 (function(){{
-  var n=0;
-  function tryStartup(){{
-    if(n++>50) return;
-    if(typeof pywebview==='undefined'||!pywebview.api||!pywebview.api.get_default_background){{
-      setTimeout(tryStartup,100); return;
-    }}
+  var started=false;
+  function startup(){{
+    if(started) return;
+    started=true;
     /* Check for a default project to auto-load */
     pywebview.api.get_default_project().then(function(projPath){{
       if(projPath){{
@@ -1173,21 +2038,67 @@ dash.srcdoc={welcome_js};
         /* No default project — apply background to welcome screen */
         pywebview.api.get_default_background().then(function(uri){{
           if(!uri) return;
-          var win=dash.contentWindow;
-          if(!win||!win.document||!win.document.body) return;
-          var b=win.document.body;
-          b.style.background='none';
-          b.style.backgroundImage='linear-gradient(rgba(15,25,35,0.75),rgba(15,25,35,0.75)),url('+uri+')';
-          b.style.backgroundSize='cover';
-          b.style.backgroundPosition='center';
-          b.style.backgroundAttachment='fixed';
+          function paint(){{
+            var win=dash.contentWindow;
+            if(!win||!win.document||!win.document.body) return;
+            var b=win.document.body;
+            b.style.background='none';
+            b.style.backgroundImage='linear-gradient(rgba(15,25,35,0.75),rgba(15,25,35,0.75)),url('+uri+')';
+            b.style.backgroundSize='cover';
+            b.style.backgroundPosition='center';
+            b.style.backgroundAttachment='fixed';
+          }}
+          /* Startup no longer waits on a timer, so the welcome page may
+             still be loading */
+          var doc=dash.contentDocument;
+          if(doc && doc.URL==='about:srcdoc' && doc.readyState==='complete') paint();
+          else dash.addEventListener('load',paint,{{once:true}});
         }});
       }}
     }});
   }}
-  setTimeout(tryStartup,150);
+  if(window.pywebview && pywebview.api && pywebview.api.get_default_project) startup();
+  else window.addEventListener('pywebviewready',startup);
 }})();
 
+/* Dashboards post 'dashboardReady' when their script has run; onload is
+   the fallback in case the script stopped early (e.g. offline Chart.js) */
+var onDashReady=null;
+window.addEventListener('message',function(e){{
+  if(e.source===dash.contentWindow && e.data==='dashboardReady' && onDashReady) onDashReady();
+}});
+function showDashboard(r,fn){{
+  var done=false;
+  function ready(){{
+    if(done) return;
+    done=true;
+    onDashReady=null;
+    fn(dash.contentWindow);
+  }}
+  dashboardHtml(r).then(function(html){{
+    onDashReady=ready;
+    dash.onload=ready;
+    dash.srcdoc=html;
+  }});
+}}
+
+/* Full dashboards cross the bridge gzipped + base64 (htmlGz) */
+function dashboardHtml(r){{
+  if(!r.htmlGz) return Promise.resolve(r.html);
+  return fetch('data:application/octet-stream;base64,'+r.htmlGz).then(function(res){{
+    return new Response(res.body.pipeThrough(new DecompressionStream('gzip'))).text();
+  }});
+}}
+
+/* Newer projects keep the picture manifest in a sidecar file; fetch it
+   while the dashboard renders instead of parsing it up front */
+function projectPictures(r){{
+  if(!r.picturesFile) return Promise.resolve(r.pictures||{{}});
+  return pywebview.api.get_pictures_manifest(r.picturesFile).then(function(raw){{
+    return JSON.parse(raw);
+  }});
+}}
+
 function loadDefaultProject(projPath){{
   pywebview.api.load_project_from_path(projPath).then(function(raw){{
     var r=JSON.parse(raw);
@@ -1206,40 +2117,27 @@ function loadDefaultProject(projPath){{
       }});
       return;
     }}
-    var pics=r.pictures;
+    var picsReady=projectPictures(r);
     var captions=r.captions||{{}};
     var mids=r.marineIds||{{}};
     var collections=r.collections||{{}};
     var bg=r.background||'';
     var bgPath=r.backgroundPath||'';
-    var hasPics=pics && Object.keys(pics).length>0;
-    dash.onload=function(){{
-      var win=dash.contentWindow;
-      var t=setInterval(function(){{
-        if(typeof win.injectPic==='function'){{
-          clearInterval(t);
-          if(typeof win.loadCaptions==='function') win.loadCaptions(captions);
-          if(typeof win.loadMarineIds==='function') win.loadMarineIds(mids);
-          if(hasPics) injectAll(win,pics,collections,bg,bgPath);
-          else if(bg && typeof win.applyLoadedBackground==='function') win.applyLoadedBackground(bg,bgPath);
-        }}
-      }},100);
-    }};
-    dash.srcdoc=r.html;
+    showDashboard(r,function(win){{
+      if(typeof win.loadCaptions==='function') win.loadCaptions(captions);
+      if(typeof win.loadMarineIds==='function') win.loadMarineIds(mids);
+      picsReady.then(function(pics){{
+        if(Object.keys(pics).length>0) injectAll(win,pics,collections,bg,bgPath);
+        else if(bg && typeof win.applyLoadedBackground==='function') win.applyLoadedBackground(bg,bgPath);
+      }});
+    }});
   }});
 }}
 
 /* Apply saved default background once dashboard iframe is ready */
-function applyDefaultBg(){{
+function applyDefaultBg(win){{
   pywebview.api.get_default_background().then(function(uri){{
-    if(!uri) return;
-    var win=dash.contentWindow;
-    var t=setInterval(function(){{
-      if(win && typeof win.applyLoadedBackground==='function'){{
-        clearInterval(t);
-        win.applyLoadedBackground(uri);
-      }}
-    }},100);
+    if(uri && typeof win.applyLoadedBackground==='function') win.applyLoadedBackground(uri);
   }});
 }}
 
@@ -1247,8 +2145,7 @@ function doNewProject(){{
   pywebview.api.generate_empty_dashboard().then(function(raw){{
     var r=JSON.parse(raw);
     if(r.error){{ alert('Error: '+r.error); return; }}
-    dash.onload=function(){{ applyDefaultBg(); }};
-    dash.srcdoc=r.html;
+    showDashboard(r,applyDefaultBg);
   }});
 }}
 
@@ -1270,8 +2167,7 @@ function doImport(){{
       pywebview.api.generate_dashboard(p).then(function(raw){{
         var r=JSON.parse(raw);
         if(r.error){{ alert('Error: '+r.error); return; }}
-        dash.onload=function(){{ applyDefaultBg(); }};
-        dash.srcdoc=r.html;
+        showDashboard(r,applyDefaultBg);
       }});
     }}
   }});
@@ -1284,26 +2180,20 @@ function doLoadProject(){{
       if(r.error!=='cancelled') alert('Error: '+r.error);
       return;
     }}
-    var pics=r.pictures;
+    var picsReady=projectPictures(r);
     var captions=r.captions||{{}};
     var mids=r.marineIds||{{}};
     var collections=r.collections||{{}};
     var bg=r.background||'';
     var bgPath=r.backgroundPath||'';
-    var hasPics=pics && Object.keys(pics).length>0;
-    dash.onload=function(){{
-      var win=dash.contentWindow;
-      var t=setInterval(function(){{
-        if(typeof win.injectPic==='function'){{
-          clearInterval(t);
-          if(typeof win.loadCaptions==='function') win.loadCaptions(captions);
-          if(typeof win.loadMarineIds==='function') win.loadMarineIds(mids);
-          if(hasPics) injectAll(win,pics,collections,bg,bgPath);
-          else if(bg && typeof win.applyLoadedBackground==='function') win.applyLoadedBackground(bg,bgPath);
-        }}
-      }},100);
-    }};
-    dash.srcdoc=r.html;
+    showDashboard(r,function(win){{
+      if(typeof win.loadCaptions==='function') win.loadCaptions(captions);
+      if(typeof win.loadMarineIds==='function') win.loadMarineIds(mids);
+      picsReady.then(function(pics){{
+        if(Object.keys(pics).length>0) injectAll(win,pics,collections,bg,bgPath);
+        else if(bg && typeof win.applyLoadedBackground==='function') win.applyLoadedBackground(bg,bgPath);
+      }});
+    }});
   }});
 }}
 
@@ -1311,9 +2201,36 @@ function injectAll(win,pics,collections,bg,bgPath){{
   /* Count total files for progress */
   var tripIdxs=Object.keys(pics);
   var totalFiles=0;
-  tripIdxs.forEach(function(idx){{ totalFiles+=pics[idx].length; }});
+  for(var i=0;i<tripIdxs.length;i++) totalFiles+=pics[tripIdxs[i]].length;
   var loaded=0;
+  /* Files per load_pic_files call: fewer bridge round trips, without
+     building one huge string for a whole trip of full-size photos */
+  var PIC_BATCH=8;
   if(totalFiles>0 && typeof win.showPicLoading==='function') win.showPicLoading(totalFiles);
+  /* Pictures come as raw bytes from the loopback file server (pic_urls);
+     base64 over the bridge is the fallback for anything it can't serve */
+  var picServer=!!pywebview.api.pic_urls && typeof win.injectPicData==='function';
+  function fetchPics(paths){{
+    if(!picServer) return pywebview.api.load_pic_files(paths).then(JSON.parse);
+    return pywebview.api.pic_urls(paths,location.origin).then(JSON.parse).then(function(urls){{
+      return Promise.all(paths.map(function(p){{
+        if(!urls[p]) return null;
+        return fetch(urls[p]).then(function(resp){{ return resp.ok ? resp.blob() : null; }},
+          function(){{ picServer=false; return null; }});
+      }}));
+    }}).then(function(blobs){{
+      var data={{}}, missing=[];
+      paths.forEach(function(p,i){{ if(blobs[i]) data[p]=blobs[i]; else missing.push(p); }});
+      if(!missing.length) return data;
+      return pywebview.api.load_pic_files(missing).then(JSON.parse).then(function(rest){{
+        return Object.assign(data,rest);
+      }});
+    }});
+  }}
+  /* Yield to the renderer between trips without a fixed timer delay */
+  var whenIdle=window.requestIdleCallback
+    ? function(cb){{ requestIdleCallback(cb,{{timeout:50}}); }}
+    : function(cb){{ setTimeout(cb,0); }};
   var ti=0;
   function nextTrip(){{
     if(ti>=tripIdxs.length){{
@@ -1331,25 +2248,33 @@ function injectAll(win,pics,collections,bg,bgPath){{
     }}
     var idx=tripIdxs[ti];
     var files=pics[idx];
+    function fetchBatch(start){{
+      var batch=files.slice(start,start+PIC_BATCH);
+      var paths=batch.map(function(p){{ return p.path||''; }}).filter(Boolean);
+      var req=paths.length ? fetchPics(paths) : Promise.resolve({{}});
+      return req.then(function(data){{ return {{batch:batch,data:data}}; }});
+    }}
+    /* Keep one batch in flight while the previous one is injected, so
+       Python reads the next files while the page decodes these */
     var fi=0;
-    function nextFile(){{
-      if(fi>=files.length){{ ti++; setTimeout(nextTrip,10); return; }}
-      var p=files[fi];
-      var filePath=p.path||'';
-      if(filePath){{
-        pywebview.api.load_pic_file(filePath).then(function(b64){{
-          if(b64) win.injectPic(parseInt(idx),p.name,p.lastModified,filePath,b64,p.caption||'');
+    var pending=files.length ? fetchBatch(0) : null;
+    function nextBatch(){{
+      if(!pending){{ ti++; whenIdle(nextTrip); return; }}
+      pending.then(function(res){{
+        fi+=PIC_BATCH;
+        pending=fi<files.length ? fetchBatch(fi) : null;
+        res.batch.forEach(function(p){{
+          var d=p.path ? res.data[p.path] : '';
+          if(typeof d==='string'){{
+            if(d) win.injectPic(parseInt(idx),p.name,p.lastModified,p.path,d,p.caption||'');
+          }} else if(d) win.injectPicData(parseInt(idx),p.name,p.lastModified,p.path,d,p.caption||'');
           loaded++;
-          if(typeof win.updatePicLoading==='function') win.updatePicLoading(loaded,totalFiles);
-          fi++; setTimeout(nextFile,5);
         }});
-      }}else{{
-        loaded++;
         if(typeof win.updatePicLoading==='function') win.updatePicLoading(loaded,totalFiles);
-        fi++; setTimeout(nextFile,5);
-      }}
+        nextBatch();
+      }});
     }}
-    setTimeout(nextFile,5);
+    nextBatch();
   }}
   nextTrip();
 }}
@@ -16,6 +16,7 @@ Double-click the HTML file to open it in your browser.
 Requirements:
     - Python 3.6+
     - No additional packages needed (uses built-in sqlite3 and json)
+    - Optional: orjson, for faster reading and writing of large logs
 """
 
 import sqlite3
@@ -24,14 +25,85 @@ import sys
 import os
 import base64
 import io
+import functools
+from collections import Counter
 from datetime import datetime
 
-def extract_dive_data(db_path):
-    """Extract dive data from Shearwater Cloud database."""
+# orjson is optional; it parses the per-dive JSON columns and serializes
+# the embedded dive data (and, in the app, project files) much faster.
+# These helpers are the only place either module calls it directly.
+try:
+    import orjson
+
+    def _json_loads(data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # Also raised for lone surrogates, which json accepts; json
+            # takes str/bytes but not buffers such as an mmap view
+            if isinstance(data, memoryview):
+                data = data.tobytes()
+            return json.loads(data)
+
+    def _json_dumps(obj):
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            # orjson rejects lone surrogates, which json escapes as \uXXXX
+            return json.dumps(obj)
+
+    def _json_dumpb(obj):
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
+    def _json_dumpb(obj):
+        # Compact, like orjson's output
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+# Shared stand-in for a missing JSON column; only ever read
+_EMPTY = {}
+
+def open_dive_log(db_path):
+    """Open a Shearwater Cloud database read-only, tuned for one full scan."""
     conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    conn.execute('PRAGMA query_only=ON')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA mmap_size=268435456')
+    conn.execute('PRAGMA cache_size=-65536')
+    return conn
+
+def _dive_rows(cursor):
+    """Iterate one row per dive, oldest first, straight off the cursor.
+
+    Each row is (number, date, location, site, depth, seconds, start PSI,
+    end PSI, O2 %, average temp F, average depth ft, end GF99); values
+    missing from the JSON columns are None.
+    """
+    try:
+        # Let SQLite pull the few fields used out of the JSON columns, so
+        # the sample data never has to reach Python
+        cursor.execute('''
+            SELECT d.DiveNumber, d.DiveDate, d.Location, d.Site, d.Depth, d.DiveLengthTime,
+                   json_extract(d.TankProfileData, '$.TankData[0].StartPressurePSI'),
+                   json_extract(d.TankProfileData, '$.TankData[0].EndPressurePSI'),
+                   json_extract(d.TankProfileData, '$.TankData[0].GasProfile.O2Percent'),
+                   json_extract(l.calculated_values_from_samples, '$.AverageTemp'),
+                   json_extract(l.calculated_values_from_samples, '$.AverageDepth'),
+                   json_extract(l.calculated_values_from_samples, '$.EndGF99')
+            FROM dive_details d
+            LEFT JOIN log_data l ON d.DiveId = l.log_id
+            ORDER BY d.DiveDate
+        ''')
+        return cursor
+    except sqlite3.OperationalError:
+        pass  # SQLite built without JSON support
     
-    # Query dive details with calculated values
     cursor.execute('''
         SELECT d.DiveNumber, d.DiveDate, d.Location, d.Site, d.Depth, d.DiveLengthTime, 
                d.TankProfileData, l.calculated_values_from_samples
@@ -39,23 +111,37 @@ def extract_dive_data(db_path):
         LEFT JOIN log_data l ON d.DiveId = l.log_id
         ORDER BY d.DiveDate
     ''')
+    return map(_parse_dive_row, cursor)
+
+def _parse_dive_row(row):
+    """Reduce a row with raw JSON columns to the _dive_rows() shape."""
+    calc = _json_loads(row[7]) if row[7] else _EMPTY
+    tank_data = _json_loads(row[6]) if row[6] else _EMPTY
+    td = gas = _EMPTY
+    if tank_data.get('TankData'):
+        td = tank_data['TankData'][0]
+        gas = td.get('GasProfile') or _EMPTY
+    return row[:6] + (
+        td.get('StartPressurePSI'), td.get('EndPressurePSI'), gas.get('O2Percent'),
+        calc.get('AverageTemp'), calc.get('AverageDepth'), calc.get('EndGF99'),
+    )
+
+def extract_dive_data(db):
+    """Extract dive data from Shearwater Cloud database.
+
+    *db* is a database path or a connection from open_dive_log().
+    """
+    conn = db if isinstance(db, sqlite3.Connection) else open_dive_log(db)
+    cursor = conn.cursor()
     
     dives = []
-    for row in cursor.fetchall():
-        calc = json.loads(row[7]) if row[7] else {}
-        tank_data = json.loads(row[6]) if row[6] else {}
-        
+    for row in _dive_rows(cursor):
         # Get tank info
-        start_psi = end_psi = 0
-        o2_pct = 21
-        if tank_data.get('TankData') and len(tank_data['TankData']) > 0:
-            td = tank_data['TankData'][0]
-            start_psi = int(td.get('StartPressurePSI') or 0)
-            end_psi = int(td.get('EndPressurePSI') or 0)
-            if td.get('GasProfile'):
-                o2_pct = td['GasProfile'].get('O2Percent', 21)
+        start_psi = int(row[6] or 0)
+        end_psi = int(row[7] or 0)
+        o2_pct = 21 if row[8] is None else row[8]
         
-        avg_temp_f = calc.get('AverageTemp', 82)
+        avg_temp_f = 82 if row[9] is None else row[9]
         avg_temp_c = round((avg_temp_f - 32) * 5/9, 1)
         
         depth_m = float(row[4]) if row[4] else 0
@@ -64,12 +150,11 @@ def extract_dive_data(db_path):
         start_time = row[1][11:16] if row[1] and len(row[1]) > 11 else ''
         end_time = ''
         if start_time and duration_sec:
-            from datetime import datetime, timedelta
+            # Fixed HH:MM slice, so plain integer math beats strptime
             try:
-                st = datetime.strptime(start_time, '%H:%M')
-                et = st + timedelta(seconds=duration_sec)
-                end_time = et.strftime('%H:%M')
-            except Exception:
+                end = (int(start_time[:2]) * 60 + int(start_time[3:])) * 60 + duration_sec
+                end_time = f'{end // 3600 % 24:02d}:{end // 60 % 60:02d}'
+            except ValueError:
                 end_time = ''
 
         dive = {
@@ -88,17 +173,18 @@ def extract_dive_data(db_path):
             'gasUsed': start_psi - end_psi if start_psi and end_psi else 0,
             'o2Percent': o2_pct,
             'avgTempC': avg_temp_c,
-            'avgDepthM': round(calc.get('AverageDepth', 0) * 0.3048, 1),  # feet to meters
-            'endGF99': round(calc.get('EndGF99', 0))
+            'avgDepthM': round((row[10] or 0) * 0.3048, 1),  # feet to meters
+            'endGF99': round(row[11] or 0)
         }
         dives.append(dive)
     
-    conn.close()
+    if conn is not db:
+        conn.close()
     return dives
 
-def get_computer_info(db_path):
-    """Get dive computer info from database."""
-    conn = sqlite3.connect(db_path)
+def get_computer_info(db):
+    """Get dive computer info from database (a path or open connection)."""
+    conn = db if isinstance(db, sqlite3.Connection) else open_dive_log(db)
     cursor = conn.cursor()
     
     try:
@@ -108,57 +194,76 @@ def get_computer_info(db_path):
             return {'serial': row[0], 'firmware': row[1]}
     except:
         pass
+    finally:
+        if conn is not db:
+            conn.close()
     
-    conn.close()
     return {'serial': 'Unknown', 'firmware': ''}
 
 def calculate_trip_stats(dives):
     """Calculate statistics for each trip/location."""
+    # One pass with running totals per location; ISO dates compare in
+    # chronological order, so no sorting is needed for the first/last day
     locations = {}
     for d in dives:
         loc = d['location'] if d['location'] else 'Unknown'
         if loc == 'Curaco':
             loc = 'Curacao'
-        if loc not in locations:
-            locations[loc] = {'dives': [], 'dates': []}
-        locations[loc]['dives'].append(d)
-        if d['date']:
-            locations[loc]['dates'].append(d['date'])
+        date = d['date']
+        s = locations.get(loc)
+        if s is None:
+            locations[loc] = {'n': 1, 'total_min': d['durationMin'], 'max_depth': d['maxDepthM'],
+                              'gas_sum': d['gasUsed'], 'first': date, 'last': date}
+            continue
+        s['n'] += 1
+        s['total_min'] += d['durationMin']
+        if d['maxDepthM'] > s['max_depth']:
+            s['max_depth'] = d['maxDepthM']
+        s['gas_sum'] += d['gasUsed']
+        if date:
+            if not s['first'] or date < s['first']:
+                s['first'] = date
+            if date > s['last']:
+                s['last'] = date
     
     trips = []
     colors = {'Bonaire': '#3b82f6', 'Cozumel': '#22c55e', 'Curacao': '#f97316'}
     
-    for loc, data in locations.items():
-        if not data['dates']:
+    for loc, s in locations.items():
+        if not s['first']:
             continue
-        dates = sorted(data['dates'])
-        start_date = datetime.strptime(dates[0], '%Y-%m-%d').strftime('%b %d')
-        end_date = datetime.strptime(dates[-1], '%Y-%m-%d').strftime('%b %d, %Y')
-        
-        total_min = sum(d['durationMin'] for d in data['dives'])
-        max_depth = max(d['maxDepthM'] for d in data['dives'])
-        avg_gas = sum(d['gasUsed'] for d in data['dives']) / len(data['dives']) if data['dives'] else 0
+        start_date = datetime.strptime(s['first'], '%Y-%m-%d').strftime('%b %d')
+        end_date = datetime.strptime(s['last'], '%Y-%m-%d').strftime('%b %d, %Y')
         
         trips.append({
             'name': loc if loc != 'Curacao' else 'Curaçao',
             'dates': f"{start_date} - {end_date}",
-            'dives': len(data['dives']),
-            'hours': round(total_min / 60, 1),
-            'maxDepth': max_depth,
-            'avgGas': round(avg_gas),
+            'dives': s['n'],
+            'hours': round(s['total_min'] / 60, 1),
+            'maxDepth': s['max_depth'],
+            'avgGas': round(s['gas_sum'] / s['n']),
             'color': colors.get(loc, '#94a3b8'),
-            '_endDate': dates[-1]
+            '_endDate': s['last']
         })
 
     trips.sort(key=lambda t: t['_endDate'])
     return trips
 
+@functools.lru_cache(maxsize=None)
 def get_logo_base64():
-    """Load and resize arrowcrab.png, return as base64 data URI."""
+    """Load and resize arrowcrab.png, return as base64 data URI.
+
+    Cached for the life of the process; the app renders many dashboards.
+    """
     script_dir = os.path.dirname(os.path.abspath(__file__))
     # Support PyInstaller bundled path
     if getattr(sys, "frozen", False):
         script_dir = sys._MEIPASS
+    # Pre-sized copy shipped alongside; skips decoding the 1024px original
+    small_path = os.path.join(script_dir, "arrowcrab_80.png")
+    if os.path.exists(small_path):
+        with open(small_path, "rb") as f:
+            return "data:image/png;base64," + base64.b64encode(f.read()).decode("ascii")
     logo_path = os.path.join(script_dir, "arrowcrab.png")
     if not os.path.exists(logo_path):
         return ""
@@ -167,7 +272,7 @@ def get_logo_base64():
         img = Image.open(logo_path)
         img = img.resize((80, 80), Image.LANCZOS)
         buf = io.BytesIO()
-        img.save(buf, format="PNG", optimize=True)
+        img.save(buf, format="PNG")
         b64 = base64.b64encode(buf.getvalue()).decode("ascii")
     except ImportError:
         with open(logo_path, "rb") as f:
@@ -175,13 +280,23 @@ def get_logo_base64():
     return f"data:image/png;base64,{b64}"
 
 
+# Version of the dashboard page. The app stores it with each project's
+# pre-rendered HTML and renders projects saved with any other version
+# again, so bump it whenever write_html's output or the logo changes.
+RENDERER_VERSION = 1
+
 def generate_html(dives, computer_info, trips):
     """Generate the complete HTML dashboard."""
+    buf = io.StringIO()
+    write_html(buf, dives, computer_info, trips)
+    return buf.getvalue()
 
-    # Convert dives to JavaScript format
-    dives_js = json.dumps(dives, indent=12)
-    trips_js = json.dumps(trips, indent=12)
-    computer_info_js = json.dumps(computer_info, indent=12)
+def write_html(out_fp, dives, computer_info, trips):
+    """Write the complete HTML dashboard to the text file *out_fp*.
+
+    The page is written in pieces around the embedded dive data, so the
+    whole document never has to exist as one string.
+    """
 
     # Get date range
     dates = [d['date'] for d in dives if d['date']]
@@ -189,12 +304,12 @@ def generate_html(dives, computer_info, trips):
 
     # Get primary gas
     o2_values = [d['o2Percent'] for d in dives if d['o2Percent'] > 21]
-    primary_gas = f"EAN{max(set(o2_values), key=o2_values.count)}" if o2_values else "Air"
+    primary_gas = f"EAN{Counter(o2_values).most_common(1)[0][0]}" if o2_values else "Air"
 
     # Get logo as base64
     logo_data_uri = get_logo_base64()
     
-    html = f'''<!DOCTYPE html>
+    out_fp.write(f'''<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -1532,9 +1647,13 @@ def generate_html(dives, computer_info, trips):
     <div id="photoTooltip"><img id="ttImg" src=""><div class="tt-name" id="ttName"></div></div>
 
     <script>
-        const dives = {dives_js};
-        const tripsData = {trips_js};
-        const computerInfo = {computer_info_js};
+        const dives = ''')
+    out_fp.write(_json_dumps(dives))
+    out_fp.write(';\n        const tripsData = ')
+    out_fp.write(_json_dumps(trips))
+    out_fp.write(';\n        const computerInfo = ')
+    out_fp.write(_json_dumps(computer_info))
+    out_fp.write(f''';
 
         let isMetric = false;
         let isPSI = true;
@@ -2384,7 +2503,7 @@ def generate_html(dives, computer_info, trips):
         let viewDiveNum = null;      /* dive number when in dive mode */
         let viewCollIdx = null;      /* collection index when in collection mode */
         const rawExts = new Set(['.orf','.cr2','.cr3','.nef','.arw','.dng']);
-        const rawCache = {{}};       /* filename -> data-URI */
+        const rawCache = {{}};       /* filename -> half-size preview data-URI */
         const picCaptions = {{}};    /* "tripIdx_filename" -> caption */
         const marineIds = {{}};      /* "tripIdx_filename" -> {{ text, site, depthM, depthFt, timestamp }} or legacy string */
         let hasApiKey = false;       /* tracks whether any API key is set */
@@ -2623,7 +2742,7 @@ def generate_html(dives, computer_info, trips):
                         let bin = '';
                         for (let j = 0; j < bytes.length; j += 8192)
                             bin += String.fromCharCode.apply(null, bytes.subarray(j, j + 8192));
-                        dataUri = await api.convert_raw(btoa(bin));
+                        dataUri = await api.convert_raw(btoa(bin), true);
                         if (dataUri && dataUri.startsWith('data:')) rawCache[q.file.name] = dataUri;
                         else dataUri = null;
                     }}
@@ -3290,7 +3409,7 @@ def generate_html(dives, computer_info, trips):
                 const lastAction = allVideo
                     ? `<span onclick="event.stopPropagation();concatenateCollectionVideos(${{idx}}, ${{ci}})" style="cursor:pointer;color:#a78bfa">concatenate videos</span>`
                     : `<span onclick="event.stopPropagation();createCollectionSlideshow(${{idx}}, ${{ci}})" style="cursor:pointer;color:#a78bfa">slideshow</span>`;
-                collHtml += `<div class="trip-pic-info" style="margin-top:2px"><span style="color:#c4b5fd;margin-right:4px">\ud83d\udcc1</span><span onclick="openCollection(${{idx}}, ${{ci}})" style="cursor:pointer;color:#a78bfa">${{c.name}}</span> <span style="color:#94a3b8">(${{c.files.length}} ${{mediaLabel}}${{c.files.length !== 1 ? 's' : ''}} \u2014 click to view)</span> | <span onclick="event.stopPropagation();deleteCollection(${{idx}}, ${{ci}})" style="cursor:pointer;color:#f87171">delete</span> | <span onclick="event.stopPropagation();copyCollection(${{idx}}, ${{ci}})" style="cursor:pointer;color:#4ade80">copy</span> | ${{lastAction}}</div>`;
+                collHtml += `<div class="trip-pic-info" style="margin-top:2px"><span style="color:#c4b5fd;margin-right:4px">\\ud83d\\udcc1</span><span onclick="openCollection(${{idx}}, ${{ci}})" style="cursor:pointer;color:#a78bfa">${{c.name}}</span> <span style="color:#94a3b8">(${{c.files.length}} ${{mediaLabel}}${{c.files.length !== 1 ? 's' : ''}} \u2014 click to view)</span> | <span onclick="event.stopPropagation();deleteCollection(${{idx}}, ${{ci}})" style="cursor:pointer;color:#f87171">delete</span> | <span onclick="event.stopPropagation();copyCollection(${{idx}}, ${{ci}})" style="cursor:pointer;color:#4ade80">copy</span> | ${{lastAction}}</div>`;
             }});
             /* Preserve existing thumbnail image if present */
             const existingThumb = el.querySelector('.trip-thumb');
@@ -3328,7 +3447,7 @@ def generate_html(dives, computer_info, trips):
                             let bin = '';
                             for (let j = 0; j < bytes.length; j += 8192)
                                 bin += String.fromCharCode.apply(null, bytes.subarray(j, j + 8192));
-                            uri = await api.convert_raw(btoa(bin));
+                            uri = await api.convert_raw(btoa(bin), true);
                             if (uri && uri.startsWith('data:')) rawCache[file.name] = uri;
                             else uri = null;
                         }} catch (e) {{ uri = null; }}
@@ -3380,7 +3499,7 @@ def generate_html(dives, computer_info, trips):
             uwOriginalSrc = '';
             uwCurrentStrength = 50;
             const uwBtn = document.getElementById('uwCorrectBtn');
-            uwBtn.textContent = '\ud83c\udf0a Underwater Correct';
+            uwBtn.textContent = '\\ud83c\\udf0a Underwater Correct';
             uwBtn.style.background = '#7c3aed';
             uwBtn.disabled = false;
             document.getElementById('uwSliderWrap').style.display = 'none';
@@ -3475,10 +3594,10 @@ def generate_html(dives, computer_info, trips):
                     for (let j = 0; j < bytes.length; j += 8192)
                         bin += String.fromCharCode.apply(null, bytes.subarray(j, j + 8192));
                     const b64 = btoa(bin);
-                    let uri = await api.convert_raw(b64);
+                    let uri = await api.convert_raw(b64, true);
                     /* Retry once on failure */
                     if (!uri || !uri.startsWith('data:')) {{
-                        uri = await api.convert_raw(b64);
+                        uri = await api.convert_raw(b64, true);
                     }}
                     if (uri && uri.startsWith('data:')) {{
                         rawCache[file.name] = uri;
@@ -3497,7 +3616,7 @@ def generate_html(dives, computer_info, trips):
                         let bin2 = '';
                         for (let j = 0; j < bytes2.length; j += 8192)
                             bin2 += String.fromCharCode.apply(null, bytes2.subarray(j, j + 8192));
-                        const uri2 = await api.convert_raw(btoa(bin2));
+                        const uri2 = await api.convert_raw(btoa(bin2), true);
                         if (uri2 && uri2.startsWith('data:')) {{
                             rawCache[file.name] = uri2;
                             if (picIdx === i) {{
@@ -4011,26 +4130,19 @@ def generate_html(dives, computer_info, trips):
                             b64 = btoa(bin);
                         }}
                     }} else if (isRaw(f.name) && convertRaws) {{
-                        let dataUri = rawCache[f.name];
-                        if (!dataUri) {{
-                            const buf = await f.arrayBuffer();
-                            const bytes = new Uint8Array(buf);
-                            let bin = '';
-                            for (let j = 0; j < bytes.length; j += 8192)
-                                bin += String.fromCharCode.apply(null, bytes.subarray(j, j + 8192));
-                            dataUri = await api.convert_raw(btoa(bin));
-                            if (dataUri && dataUri.startsWith('data:')) rawCache[f.name] = dataUri;
-                        }}
+                        /* Exports get a full-size conversion; rawCache only holds previews */
+                        const rawBuf = await f.arrayBuffer();
+                        const rawBytes = new Uint8Array(rawBuf);
+                        let rawBin = '';
+                        for (let j = 0; j < rawBytes.length; j += 8192)
+                            rawBin += String.fromCharCode.apply(null, rawBytes.subarray(j, j + 8192));
+                        const rawB64 = btoa(rawBin);
+                        const dataUri = await api.convert_raw(rawB64, false);
                         if (dataUri && dataUri.startsWith('data:')) {{
                             b64 = dataUri.split(',')[1];
                             newName = newName.replace(/\\.[^.]+$/, '.jpg');
                         }} else {{
-                            const buf = await f.arrayBuffer();
-                            const bytes = new Uint8Array(buf);
-                            let bin = '';
-                            for (let j = 0; j < bytes.length; j += 8192)
-                                bin += String.fromCharCode.apply(null, bytes.subarray(j, j + 8192));
-                            b64 = btoa(bin);
+                            b64 = rawB64;
                         }}
                     }} else {{
                         const buf = await f.arrayBuffer();
@@ -4620,6 +4732,18 @@ def generate_html(dives, computer_info, trips):
             await concatenateVideoFiles(kept, siteName);
         }}
 
+        /* Absolute on-disk path of a picked file, if it was resolved */
+        function diskPathOf(f) {{
+            for (const [idx, files] of Object.entries(tripFiles)) {{
+                const i = files.indexOf(f);
+                if (i >= 0) {{
+                    const picData = tripPicData[idx];
+                    return (picData && picData[i] && picData[i].path) || '';
+                }}
+            }}
+            return '';
+        }}
+
         async function concatenateVideoFiles(files, outputName) {{
             if (files.length === 0) return;
             const api = window.parent && window.parent.pywebview && window.parent.pywebview.api;
@@ -4648,14 +4772,19 @@ def generate_html(dives, computer_info, trips):
                 pText.textContent = (i + 1) + ' / ' + files.length + ' \u2014 ' + f.name;
                 pBar.style.width = Math.round(((i + 1) / files.length) * 100) + '%';
                 try {{
-                    const buf = await f.arrayBuffer();
-                    const bytes = new Uint8Array(buf);
-                    let bin = '';
-                    for (let j = 0; j < bytes.length; j += 8192)
-                        bin += String.fromCharCode.apply(null, bytes.subarray(j, j + 8192));
-                    const b64 = btoa(bin);
                     const tempPath = parentDir + '\\\\__temp_' + i + '_' + f.name;
-                    const ok = await api.save_video_blob(b64, tempPath);
+                    /* Files still on disk are copied by Python directly */
+                    const srcPath = api.save_video_path ? diskPathOf(f) : '';
+                    let ok = srcPath ? await api.save_video_path(srcPath, tempPath) : '';
+                    if (!ok) {{
+                        const buf = await f.arrayBuffer();
+                        const bytes = new Uint8Array(buf);
+                        let bin = '';
+                        for (let j = 0; j < bytes.length; j += 8192)
+                            bin += String.fromCharCode.apply(null, bytes.subarray(j, j + 8192));
+                        const b64 = btoa(bin);
+                        ok = await api.save_video_blob(b64, tempPath);
+                    }}
                     if (ok) tempPaths.push(tempPath);
                 }} catch (e) {{}}
             }}
@@ -4730,7 +4859,7 @@ def generate_html(dives, computer_info, trips):
                             let bin = '';
                             for (let j = 0; j < bytes.length; j += 8192)
                                 bin += String.fromCharCode.apply(null, bytes.subarray(j, j + 8192));
-                            uri = await api.convert_raw(btoa(bin));
+                            uri = await api.convert_raw(btoa(bin), true);
                             if (uri && uri.startsWith('data:')) rawCache[f.name] = uri;
                             else uri = null;
                         }} catch (e) {{ uri = null; }}
@@ -4833,7 +4962,7 @@ def generate_html(dives, computer_info, trips):
                             let bin = '';
                             for (let j = 0; j < bytes.length; j += 8192)
                                 bin += String.fromCharCode.apply(null, bytes.subarray(j, j + 8192));
-                            uri = await api.convert_raw(btoa(bin));
+                            uri = await api.convert_raw(btoa(bin), true);
                             if (uri && uri.startsWith('data:')) rawCache[f.name] = uri;
                             else uri = null;
                         }} catch (e) {{ uri = null; }}
@@ -4917,7 +5046,7 @@ def generate_html(dives, computer_info, trips):
                 imgEl.style.filter = '';
                 if (uwOriginalSrc) imgEl.src = uwOriginalSrc;
                 uwApplied = false;
-                btn.textContent = '\ud83c\udf0a Underwater Correct';
+                btn.textContent = '\\ud83c\\udf0a Underwater Correct';
                 btn.style.background = '#7c3aed';
                 sliderWrap.style.display = 'none';
                 correctImageForViewer(imgEl);
@@ -4940,7 +5069,7 @@ def generate_html(dives, computer_info, trips):
             }}
 
             /* Apply correction */
-            btn.textContent = '\ud83c\udf0a Correcting...';
+            btn.textContent = '\\ud83c\\udf0a Correcting...';
             btn.disabled = true;
             const strengthFloat = strength / 100.0;
             try {{
@@ -4981,11 +5110,11 @@ def generate_html(dives, computer_info, trips):
                     btn.style.background = '#059669';
                     sliderWrap.style.display = 'flex';
                 }} else {{
-                    btn.textContent = '\ud83c\udf0a Underwater Correct';
+                    btn.textContent = '\\ud83c\\udf0a Underwater Correct';
                     alert('Correction failed. The image may not need correction.');
                 }}
             }} catch (e) {{
-                btn.textContent = '\ud83c\udf0a Underwater Correct';
+                btn.textContent = '\\ud83c\\udf0a Underwater Correct';
             }}
             btn.disabled = false;
         }}
@@ -4998,7 +5127,7 @@ def generate_html(dives, computer_info, trips):
                 const imgEl = document.getElementById('picImg');
                 imgEl.src = uwOriginalSrc;
                 uwApplied = false;
-                document.getElementById('uwCorrectBtn').textContent = '\ud83c\udf0a Underwater Correct';
+                document.getElementById('uwCorrectBtn').textContent = '\\ud83c\\udf0a Underwater Correct';
                 document.getElementById('uwCorrectBtn').style.background = '#7c3aed';
             }}
             await applyUnderwaterCorrection();
@@ -5032,7 +5161,7 @@ def generate_html(dives, computer_info, trips):
                             let bin = '';
                             for (let j = 0; j < bytes.length; j += 8192)
                                 bin += String.fromCharCode.apply(null, bytes.subarray(j, j + 8192));
-                            const uri = await api.convert_raw(btoa(bin));
+                            const uri = await api.convert_raw(btoa(bin), true);
                             if (uri && uri.startsWith('data:')) {{
                                 rawCache[idFile.name] = uri;
                                 imgEl.src = uri;
@@ -5178,7 +5307,7 @@ def generate_html(dives, computer_info, trips):
                     let bin = '';
                     for (let j = 0; j < bytes.length; j += 8192)
                         bin += String.fromCharCode.apply(null, bytes.subarray(j, j + 8192));
-                    imgSrc = await api2.convert_raw(btoa(bin));
+                    imgSrc = await api2.convert_raw(btoa(bin), true);
                     if (imgSrc && imgSrc.startsWith('data:')) rawCache[f.name] = imgSrc;
                 }}
             }} else {{
@@ -5454,7 +5583,7 @@ def generate_html(dives, computer_info, trips):
                         let bin = '';
                         for (let j = 0; j < bytes.length; j += 8192)
                             bin += String.fromCharCode.apply(null, bytes.subarray(j, j + 8192));
-                        imgSrc = await api.convert_raw(btoa(bin));
+                        imgSrc = await api.convert_raw(btoa(bin), true);
                         if (imgSrc && imgSrc.startsWith('data:')) rawCache[f.name] = imgSrc;
                     }} else {{
                         imgSrc = await fileToDataURI(f, MAX_DIM, MAX_DIM);
@@ -5973,6 +6102,10 @@ def generate_html(dives, computer_info, trips):
                         }} else {{
                             showToast('MP4 video saved: ' + (st.path || '').split(/[\\\\/]/).pop(), 6000);
                         }}
+                    }} else if (st.state === 'encoding' && st.progress !== undefined) {{
+                        if (!overlay.classList.contains('hidden')) {{
+                            pText.textContent = 'Encoding in background (' + Math.round(st.progress * 100) + '%). You can close this and continue working.';
+                        }}
                     }} else if (st.state === 'error') {{
                         clearInterval(poll);
                         if (!overlay.classList.contains('hidden')) {{
@@ -6092,7 +6225,7 @@ audioJs +
                             let bin = '';
                             for (let j = 0; j < bytes.length; j += 8192)
                                 bin += String.fromCharCode.apply(null, bytes.subarray(j, j + 8192));
-                            uri = await api.convert_raw(btoa(bin));
+                            uri = await api.convert_raw(btoa(bin), true);
                             if (uri && uri.startsWith('data:')) rawCache[f.name] = uri;
                             else uri = null;
                         }} catch (e) {{ uri = null; }}
@@ -6279,7 +6412,12 @@ audioJs +
             const binary = atob(b64Data);
             const bytes = new Uint8Array(binary.length);
             for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
-            const file = new File([bytes], name, {{ lastModified: lastModified }});
+            injectPicData(tripIdx, name, lastModified, path, bytes, caption);
+        }}
+
+        /* Same as injectPic, with the file contents as a Blob or byte array */
+        function injectPicData(tripIdx, name, lastModified, path, data, caption) {{
+            const file = new File([data], name, {{ lastModified: lastModified }});
             if (!tripFiles[tripIdx]) {{
                 tripFiles[tripIdx] = [];
                 keptStatus[tripIdx] = [];
@@ -6394,7 +6532,7 @@ audioJs +
                     setTimeout(tryCheckKey, 100);
                 }}
             }}
-            setTimeout(tryCheckKey, 150);
+            tryCheckKey();
         }})();
 
         /* Auto-load saved default background from parent pywebview API */
@@ -6412,13 +6550,15 @@ audioJs +
                     setTimeout(tryLoadBg, 100);
                 }}
             }}
-            setTimeout(tryLoadBg, 150);
+            tryLoadBg();
         }})();
+
+        /* Tell the app shell the page API (injectPic etc.) is ready */
+        if (window.parent !== window) window.parent.postMessage('dashboardReady', '*');
     </script>
 </body>
 </html>
-'''
-    return html
+''')
 
 def main():
     if len(sys.argv) < 2:
@@ -6436,20 +6576,22 @@ def main():
     print(f"Reading Shearwater database: {db_path}")
     
     try:
-        dives = extract_dive_data(db_path)
-        print(f"Found {len(dives)} dives")
-        
-        computer_info = get_computer_info(db_path)
-        print(f"Computer serial: {computer_info['serial']}")
+        conn = open_dive_log(db_path)
+        try:
+            dives = extract_dive_data(conn)
+            print(f"Found {len(dives)} dives")
+            
+            computer_info = get_computer_info(conn)
+            print(f"Computer serial: {computer_info['serial']}")
+        finally:
+            conn.close()
         
         trips = calculate_trip_stats(dives)
         print(f"Found {len(trips)} trips/locations")
         
-        html = generate_html(dives, computer_info, trips)
-        
         output_path = 'dive_dashboard.html'
         with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html)
+            write_html(f, dives, computer_info, trips)
         
         print(f"\nDashboard created: {output_path}")
         print("\nDouble-click the HTML file to open it in your browser!")
@@ -0,0 +1,105 @@
+"""Project files must survive a save/load round trip.
+
+JSON.stringify can hand the app lone UTF-16 surrogates (e.g. in a pasted
+caption); they are saved through json's \\uXXXX escapes and have to load
+again whether or not orjson is installed.
+"""
+
+import json
+
+import pytest
+
+import divelog_app
+
+LONE = "reef \ud83d shark"
+
+
+class _SaveDialogWindow:
+    """Stands in for the pywebview window; the save dialog returns *path*."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def create_file_dialog(self, *args, **kwargs):
+        return self.path
+
+
+def _project():
+    return {
+        "dives": [],
+        "computerInfo": {"serial": "N/A"},
+        "trips": [],
+        "captions": {"IMG_0001.JPG": LONE},
+        "pictures": {"0": [{"name": LONE, "path": "C:/pics/IMG_0001.JPG"}]},
+    }
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def json_backend(request, monkeypatch):
+    """Run each test with orjson (when installed) and with plain json."""
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(divelog_app, "orjson", None)
+        monkeypatch.setattr(divelog_app, "_json_loads", json.loads)
+        monkeypatch.setattr(divelog_app, "_json_dumps", json.dumps)
+        monkeypatch.setattr(
+            divelog_app, "_json_dumpb", lambda obj: json.dumps(obj).encode("utf-8")
+        )
+    return request.param
+
+
+def test_load_json_file_lone_surrogate(tmp_path, json_backend):
+    path = tmp_path / "proj.json"
+    path.write_bytes(divelog_app._json_dumpb({"caption": LONE}))
+    assert divelog_app._load_json_file(str(path)) == {"caption": LONE}
+
+
+def test_project_save_load_round_trip(tmp_path, json_backend):
+    path = str(tmp_path / "dive_project.json")
+    api = divelog_app.Api()
+    api.window = _SaveDialogWindow(path)
+    assert api.save_project_json(json.dumps(_project())) == path
+
+    resp = json.loads(api.load_project_from_path(path))
+    assert "error" not in resp, resp.get("error")
+    assert resp["captions"] == {"IMG_0001.JPG": LONE}
+    manifest = json.loads(api.get_pictures_manifest(resp["picturesFile"]))
+    assert manifest["0"][0]["name"] == LONE
+
+
+@pytest.mark.parametrize("as_type", [bytes, str, memoryview])
+def test_json_helpers_lone_surrogate(as_type):
+    pytest.importorskip("orjson")
+    obj = {"caption": LONE, "n": [1, 2.5, None]}
+    raw = divelog_app._json_dumpb(obj)
+    assert json.loads(divelog_app._json_dumps(obj)) == obj
+    data = raw.decode("utf-8") if as_type is str else as_type(raw)
+    assert divelog_app._json_loads(data) == obj
+
+
+def test_saved_html_reused_until_renderer_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / "dive_project.json")
+    api = divelog_app.Api()
+    api.window = _SaveDialogWindow(path)
+    api.save_project_json(json.dumps(_project()))
+    stored = divelog_app._load_json_file(path)
+    assert stored["htmlRenderer"] == divelog_app.RENDERER_VERSION
+
+    rendered = []
+    real = divelog_app.generate_html
+    monkeypatch.setattr(
+        divelog_app, "generate_html", lambda *a: rendered.append(a) or real(*a)
+    )
+    # A fresh session opening and re-saving the project renders nothing
+    api = divelog_app.Api()
+    api.window = _SaveDialogWindow(path)
+    assert json.loads(api.load_project_from_path(path))["htmlGz"] == stored["htmlGz"]
+    api.save_project_json(json.dumps(_project()))
+    assert rendered == []
+
+    # A project saved by another renderer version is rendered again
+    monkeypatch.setattr(divelog_app, "RENDERER_VERSION", stored["htmlRenderer"] + 1)
+    api = divelog_app.Api()
+    api.load_project_from_path(path)
+    assert len(rendered) == 1